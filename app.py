@@ -1,12 +1,26 @@
 import os
 import json
+import time
+import sqlite3
 import hashlib
+import threading
+import weakref
+import functools
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from io import BytesIO
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import date, datetime, time as dt_time
+from typing import Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import streamlit as st
-from openai import OpenAI
+from openai import (
+    APIConnectionError, APITimeoutError, InternalServerError, OpenAI, RateLimitError,
+)
+try:
+    from streamlit.runtime.scriptrunner import StopException, add_script_run_ctx, get_script_run_ctx
+except ImportError:
+    add_script_run_ctx = get_script_run_ctx = StopException = None
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
@@ -15,6 +29,9 @@ from reportlab.lib.enums import TA_LEFT, TA_CENTER
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+from cancellation import GenerationCancelled, GenerationScope, GenerationToken
+from report_archive import ReportRef, get_archive
+
 # ============ CONSTANTS ============
 SIGNS_GR_TO_EN = {
     "Κριός": "Aries", "Ταύρος": "Taurus", "Δίδυμοι": "Gemini",
@@ -112,6 +129,15 @@ def compute_payload_hash(payload: dict) -> str:
     return hashlib.sha256(json_str.encode()).hexdigest()
 
 
+def memoize_in_session(name: str, inputs: tuple, compute: Callable[[], object]):
+    """Return the value stored in st.session_state for name, recomputing only when inputs change."""
+    derived = st.session_state.setdefault("_derived", {})
+    cached = derived.get(name)
+    if cached is None or cached[0] != inputs:
+        derived[name] = (inputs, compute())
+    return derived[name][1]
+
+
 def validate_chart_data(payload: dict) -> List[str]:
     """Validate chart completeness and return warnings."""
     warnings = []
@@ -140,21 +166,373 @@ def validate_chart_data(payload: dict) -> List[str]:
     return warnings
 
 
-# ============ OPENAI FUNCTIONS (CACHED) ============
-@st.cache_data(show_spinner=False)
-def generate_basic_report_cached(payload_hash: str, payload: dict) -> str:
-    return generate_basic_report_with_openai(payload)
+def compute_questions_hash(questions: List[str]) -> str:
+    """Compute SHA256 hash of the selected questions for caching."""
+    return hashlib.sha256(
+        json.dumps(questions, sort_keys=True, ensure_ascii=False).encode()
+    ).hexdigest()
 
 
-def generate_basic_report_with_openai(payload: dict) -> str:
-    client = get_openai_client()
-    if client is None:
-        return "⚠️ Δεν βρέθηκε OPENAI_API_KEY στο περιβάλλον."
+def compute_inputs_hash(*inputs) -> str:
+    """Hash of the raw chart inputs, so a rerun can tell whether the chart was edited."""
+    # repr αντί για json: τα κλειδιά των όψεων είναι tuples.
+    return hashlib.sha256(repr(inputs).encode()).hexdigest()
+
+
+def build_chart_payload(
+    full_name: str,
+    gender: str,
+    sun_sign_gr: str,
+    asc_sign_gr: str,
+    moon_sign_gr: str,
+    houses_signs_gr: Dict[int, str],
+    planet_house_map: Dict[str, int],
+    planet_sign_map: Dict[str, dict],
+    aspects_selected_ui: Dict[tuple, str],
+    aspect_orbs: Optional[Dict[tuple, float]] = None,
+) -> dict:
+    """Build the chart JSON payload from the values entered in the UI.
+
+    aspect_orbs: πραγματικά orbs ανά ζεύγος, όταν ο χάρτης υπολογίστηκε από τη μηχανή εφημερίδων.
+    """
+    label_to_code = {opt[0]: opt[1] for opt in ASPECT_OPTIONS}
+
+    basic_info = {
+        "full_name": full_name.strip(),
+        "gender": gender,
+        "sun_sign_gr": sun_sign_gr,
+        "sun_sign": SIGNS_GR_TO_EN[sun_sign_gr],
+        "asc_sign_gr": asc_sign_gr,
+        "asc_sign": SIGNS_GR_TO_EN[asc_sign_gr],
+        "moon_sign_gr": moon_sign_gr,
+        "moon_sign": SIGNS_GR_TO_EN[moon_sign_gr],
+    }
+
+    houses = []
+    for house_num, sign_gr in houses_signs_gr.items():
+        if sign_gr == "---":
+            continue
+        sign_en = SIGNS_GR_TO_EN[sign_gr]
+        ruler_en = SIGN_RULERS.get(sign_en)
+        ruler_gr = PLANET_EN_TO_GR.get(ruler_en, ruler_en) if ruler_en else None
+        ruler_in_house = planet_house_map.get(ruler_en)
+        houses.append({
+            "house": house_num, "sign_gr": sign_gr, "sign": sign_en,
+            "ruler": ruler_en, "ruler_gr": ruler_gr, "ruler_in_house": ruler_in_house,
+        })
+
+    planets_in_houses = []
+    for en_name, house_num in planet_house_map.items():
+        gr_name = next(gr for gr, en in PLANETS if en == en_name)
+        sign_info = planet_sign_map.get(en_name, {})
+        planets_in_houses.append(
+            {
+                "planet": en_name,
+                "planet_gr": gr_name,
+                "house": house_num,
+                "sign_gr": sign_info.get("sign_gr"),
+                "sign": sign_info.get("sign"),
+            }
+        )
+
+    aspects = []
+    for (p1, p2), label in aspects_selected_ui.items():
+        code = label_to_code.get(label)
+        if code is None:
+            continue
+        gr1 = next(gr for gr, en in PLANETS if en == p1)
+        gr2 = next(gr for gr, en in PLANETS if en == p2)
+        aspect = {
+            "p1": p1, "p1_gr": gr1, "p2": p2, "p2_gr": gr2,
+            "aspect": code, "aspect_label_gr": label,
+        }
+        if aspect_orbs and (p1, p2) in aspect_orbs:
+            aspect["orb"] = aspect_orbs[(p1, p2)]
+        aspects.append(aspect)
+
+    return {
+        "basic_info": basic_info,
+        "houses": houses,
+        "planets_in_houses": planets_in_houses,
+        "aspects": aspects,
+    }
+
+
+# ============ EPHEMERIS ENGINE ============
+# Keplerian στοιχεία JPL (E.M. Standish, "Approximate Positions of the Planets",
+# Table 1, 1800–2050), εκλειπτική & ισημερία J2000:
+# (a [AU], e, I [°], L [°], ϖ [°], Ω [°]) και οι ρυθμοί τους ανά ιουλιανό αιώνα.
+KEPLER_ELEMENTS = {
+    "Mercury": ((0.38709927, 0.20563593, 7.00497902, 252.25032350, 77.45779628, 48.33076593),
+                (0.00000037, 0.00001906, -0.00594749, 149472.67411175, 0.16047689, -0.12534081)),
+    "Venus": ((0.72333566, 0.00677672, 3.39467605, 181.97909950, 131.60246718, 76.67984255),
+              (0.00000390, -0.00004107, -0.00078890, 58517.81538729, 0.00268329, -0.27769418)),
+    "Earth": ((1.00000261, 0.01671123, -0.00001531, 100.46457166, 102.93768193, 0.0),
+              (0.00000562, -0.00004392, -0.01294668, 35999.37244981, 0.32327364, 0.0)),
+    "Mars": ((1.52371034, 0.09339410, 1.84969142, -4.55343205, -23.94362959, 49.55953891),
+             (0.00001847, 0.00007882, -0.00813131, 19140.30268499, 0.44441088, -0.29257343)),
+    "Jupiter": ((5.20288700, 0.04838624, 1.30439695, 34.39644051, 14.72847983, 100.47390909),
+                (-0.00011607, -0.00013253, -0.00183714, 3034.74612775, 0.21252668, 0.20469106)),
+    "Saturn": ((9.53667594, 0.05386179, 2.48599187, 49.95424423, 92.59887831, 113.66242448),
+               (-0.00125060, -0.00050991, 0.00193609, 1222.49362201, -0.41897216, -0.28867794)),
+    "Uranus": ((19.18916464, 0.04725744, 0.77263783, 313.23810451, 170.95427630, 74.01692503),
+               (-0.00196176, -0.00004397, -0.00242939, 428.48202785, 0.40805281, 0.04240589)),
+    "Neptune": ((30.06992276, 0.00859048, 1.77004347, -55.12002969, 44.96476227, 131.78422574),
+                (0.00026291, 0.00005105, 0.00035372, 218.45945325, -0.32241464, -0.00508664)),
+    "Pluto": ((39.48211675, 0.24882730, 17.14001206, 238.92903833, 224.06891629, 110.30393684),
+              (-0.00031596, 0.00005170, 0.00004818, 145.20780515, -0.04062942, -0.01183482)),
+    # Χείρωνας: σταθερά οσκουλάροντα στοιχεία (περιήλιο 14/02/1996). Οι διαταραχές από
+    # Κρόνο/Ουρανό δεν μοντελοποιούνται, οπότε η θέση είναι προσεγγιστική (~1–3°).
+    "Chiron": ((13.648, 0.3790, 6.935, 216.30, 188.60, 209.20),
+               (0.0, 0.0, 0.0, 714.03, 0.0, 0.0)),
+}
+
+# Κύριοι όροι της σεληνιακής θεωρίας (Meeus, κεφ. 47): (D, M, M', F, συντελεστής σε 1e-6 °).
+MOON_LONGITUDE_TERMS = np.array([
+    (0, 0, 1, 0, 6288774), (2, 0, -1, 0, 1274027), (2, 0, 0, 0, 658314),
+    (0, 0, 2, 0, 213618), (0, 1, 0, 0, -185116), (0, 0, 0, 2, -114332),
+    (2, 0, -2, 0, 58793), (2, -1, -1, 0, 57066), (2, 0, 1, 0, 53322),
+    (2, -1, 0, 0, 45758), (0, 1, -1, 0, -40923), (1, 0, 0, 0, -34720),
+    (0, 1, 1, 0, -30383), (2, 0, 0, -2, 15327), (0, 0, 1, 2, -12528),
+    (0, 0, 1, -2, 10980), (4, 0, -1, 0, 10675), (0, 0, 3, 0, 10034),
+    (4, 0, -2, 0, 8548), (2, 1, -1, 0, -7888), (2, 1, 0, 0, -6766),
+    (1, 0, -1, 0, -5163), (1, 1, 0, 0, 4987), (2, -1, 1, 0, 4036),
+    (2, 0, 2, 0, 3994), (4, 0, 0, 0, 3861), (2, 0, -3, 0, 3665),
+])
+
+PLACIDUS_MAX_ITERATIONS = 100
+PLACIDUS_TOLERANCE_DEG = 1e-7
+
+# Γενική μετάπτωση στο μήκος (°/αιώνα): από ισημερία J2000 σε ισημερία ημερομηνίας.
+PRECESSION_DEG_PER_CENTURY = 1.3969713
+
+ASPECT_ANGLES = {"conjunction": 0.0, "sextile": 60.0, "square": 90.0, "trine": 120.0, "opposition": 180.0}
+ASPECT_ORBS = {"conjunction": 8.0, "sextile": 5.0, "square": 7.0, "trine": 7.0, "opposition": 8.0}
+
+EPHEMERIS_BODIES = [en for _, en in PLANETS]
+ASPECT_PAIRS = [
+    (i, j)
+    for i, (_, en1) in enumerate(PLANETS) if en1 not in ("AC", "MC")
+    for j in range(i + 1, len(PLANETS))
+]
+
 
-    system_prompt = """Είσαι έμπειρη αστρολόγος.
-Λαμβάνεις ως είσοδο ένα JSON με δομή γενέθλιου χάρτη: basic_info, houses, planets_in_houses και aspects.
-Θέλω να γράψεις ΠΑΝΤΑ σε καλή, καθαρή ελληνική γλώσσα.
+def julian_day_ut(birth: datetime, utc_offset_hours: float = 0.0) -> float:
+    """Julian day (UT) for a local civil birth datetime and its UTC offset in hours."""
+    days = (birth - datetime(2000, 1, 1, 12)).total_seconds() / 86400.0
+    return 2451545.0 + days - utc_offset_hours / 24.0
+
+
+def _heliocentric_xyz(name: str, T: np.ndarray):
+    elements, rates = KEPLER_ELEMENTS[name]
+    a, e, inc, L, peri, node = (base + rate * T for base, rate in zip(elements, rates))
+
+    M = np.radians((L - peri) % 360.0)
+    E = M + e * np.sin(M)
+    for _ in range(6):
+        E = E - (E - e * np.sin(E) - M) / (1.0 - e * np.cos(E))
+
+    xp = a * (np.cos(E) - e)
+    yp = a * np.sqrt(1.0 - e * e) * np.sin(E)
+    w = np.radians(peri - node)
+    om = np.radians(node)
+    i = np.radians(inc)
+    cw, sw, co, so, ci, si = np.cos(w), np.sin(w), np.cos(om), np.sin(om), np.cos(i), np.sin(i)
+    x = (cw * co - sw * so * ci) * xp + (-sw * co - cw * so * ci) * yp
+    y = (cw * so + sw * co * ci) * xp + (-sw * so + cw * co * ci) * yp
+    z = (sw * si) * xp + (cw * si) * yp
+    return x, y, z
+
+
+def _moon_longitude(T: np.ndarray) -> np.ndarray:
+    Lp = 218.3164477 + 481267.88123421 * T
+    D = np.radians(297.8501921 + 445267.1114034 * T)
+    M = np.radians(357.5291092 + 35999.0502909 * T)
+    Mp = np.radians(134.9633964 + 477198.8675055 * T)
+    F = np.radians(93.2720950 + 483202.0175233 * T)
+    E = 1.0 - 0.002516 * T
+
+    terms = MOON_LONGITUDE_TERMS
+    arg = (np.outer(D, terms[:, 0]) + np.outer(M, terms[:, 1])
+           + np.outer(Mp, terms[:, 2]) + np.outer(F, terms[:, 3]))
+    ecc = E[:, None] ** np.abs(terms[:, 1])
+    return (Lp + (terms[:, 4] * ecc * np.sin(arg)).sum(axis=1) * 1e-6) % 360.0
+
+
+def _ecliptic_from_ra(ra: np.ndarray, eps: np.ndarray) -> np.ndarray:
+    return np.degrees(np.arctan2(np.sin(np.radians(ra)), np.cos(np.radians(ra)) * np.cos(eps))) % 360.0
+
+
+def compute_house_cusps(ramc: np.ndarray, eps: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """Placidus cusps, shape (N, 12); Porphyry above the polar circles where Placidus is undefined."""
+    phi = np.radians(lat)
+    mc = _ecliptic_from_ra(ramc, eps)
+    r = np.radians(ramc)
+    asc = np.degrees(np.arctan2(np.cos(r), -(np.sin(r) * np.cos(eps) + np.tan(phi) * np.sin(eps)))) % 360.0
+    # Πάνω από τους πολικούς κύκλους ο τύπος δίνει συχνά το δύον σημείο· ο Ωροσκόπος
+    # είναι πάντα στο ανατολικό μισό, έως 180° μετά το MC.
+    asc = np.where((asc - mc) % 360.0 > 180.0, (asc + 180.0) % 360.0, asc)
+
+    def placidus(frac: float, diurnal: bool) -> np.ndarray:
+        lam = _ecliptic_from_ra(ramc + (90.0 * frac if diurnal else 180.0 - 90.0 * frac), eps)
+        # Κοντά στον πολικό κύκλο η σύγκλιση αργεί· επαναλαμβάνουμε μέχρι την ανοχή.
+        for _ in range(PLACIDUS_MAX_ITERATIONS):
+            dec = np.arcsin(np.sin(eps) * np.sin(np.radians(lam)))
+            semi_arc = 90.0 + np.degrees(np.arcsin(np.clip(np.tan(phi) * np.tan(dec), -1.0, 1.0)))
+            ra = ramc + frac * semi_arc if diurnal else ramc + 180.0 - frac * (180.0 - semi_arc)
+            previous, lam = lam, _ecliptic_from_ra(ra, eps)
+            if np.all(np.abs((lam - previous + 180.0) % 360.0 - 180.0) < PLACIDUS_TOLERANCE_DEG):
+                break
+        return lam
+
+    c11, c12 = placidus(1 / 3, True), placidus(2 / 3, True)
+    c2, c3 = placidus(2 / 3, False), placidus(1 / 3, False)
+
+    # Το Placidus ορίζεται μέχρι |φ| < 90° − ε· πιο πάνω κάποια σημεία της εκλειπτικής δεν δύουν ποτέ.
+    polar = np.abs(phi) >= np.pi / 2 - eps
+    if polar.any():
+        q1 = (asc - mc) % 360.0
+        q2 = (mc + 180.0 - asc) % 360.0
+        c11 = np.where(polar, (mc + q1 / 3) % 360.0, c11)
+        c12 = np.where(polar, (mc + 2 * q1 / 3) % 360.0, c12)
+        c2 = np.where(polar, (asc + q2 / 3) % 360.0, c2)
+        c3 = np.where(polar, (asc + 2 * q2 / 3) % 360.0, c3)
+
+    first_half = np.stack([asc, c2, c3, mc + 180.0, c11 + 180.0, c12 + 180.0], axis=1)
+    return np.concatenate([first_half, first_half + 180.0], axis=1) % 360.0
+
+
+def compute_longitudes(jd_ut, lat, lon):
+    """Tropical longitudes for EPHEMERIS_BODIES, shape (N, 14), and house cusps, shape (N, 12).
+
+    Όλοι οι υπολογισμοί είναι διανυσματικοί πάνω σε N εγγραφές γέννησης.
+    """
+    jd_ut = np.atleast_1d(np.asarray(jd_ut, dtype=float))
+    lat = np.broadcast_to(np.asarray(lat, dtype=float), jd_ut.shape)
+    lon = np.broadcast_to(np.asarray(lon, dtype=float), jd_ut.shape)
+    days = jd_ut - 2451545.0
+    T = days / 36525.0
+    precession = PRECESSION_DEG_PER_CENTURY * T
+    eps = np.radians(23.439291 - 0.0130042 * T)
+
+    xe, ye, _ = _heliocentric_xyz("Earth", T)
+    longitudes = np.empty((jd_ut.size, len(EPHEMERIS_BODIES)))
+    for col, body in enumerate(EPHEMERIS_BODIES):
+        if body == "Sun":
+            longitudes[:, col] = np.degrees(np.arctan2(-ye, -xe)) + precession
+        elif body == "Moon":
+            longitudes[:, col] = _moon_longitude(T)
+        elif body == "North Node":
+            longitudes[:, col] = 125.0445479 - 1934.1362891 * T
+        elif body in KEPLER_ELEMENTS:
+            x, y, _ = _heliocentric_xyz(body, T)
+            longitudes[:, col] = np.degrees(np.arctan2(y - ye, x - xe)) + precession
+
+    gmst = 280.46061837 + 360.98564736629 * days + 0.000387933 * T ** 2
+    ramc = (gmst + lon) % 360.0
+    cusps = compute_house_cusps(ramc, eps, lat)
+    longitudes[:, EPHEMERIS_BODIES.index("AC")] = cusps[:, 0]
+    longitudes[:, EPHEMERIS_BODIES.index("MC")] = cusps[:, 9]
+    return longitudes % 360.0, cusps
+
+
+def assign_houses(longitudes: np.ndarray, cusps: np.ndarray) -> np.ndarray:
+    """House number (1–12) of every longitude, shape (N, P)."""
+    widths = (np.roll(cusps, -1, axis=1) - cusps) % 360.0
+    offsets = (longitudes[:, :, None] - cusps[:, None, :]) % 360.0
+    return (offsets < widths[:, None, :]).argmax(axis=2) + 1
+
+
+def find_aspects(longitudes: np.ndarray):
+    """Closest major aspect for every pair in ASPECT_PAIRS, vectorized over charts and pairs.
+
+    Επιστρέφει (codes, orbs), shape (N, len(ASPECT_PAIRS)): δείκτη στο ASPECT_ANGLES
+    (-1 όταν δεν υπάρχει όψη εντός orb) και την πραγματική απόκλιση σε μοίρες.
+    """
+    pairs = np.array(ASPECT_PAIRS)
+    separation = np.abs((longitudes[:, pairs[:, 0]] - longitudes[:, pairs[:, 1]] + 180.0) % 360.0 - 180.0)
+    angles = np.array(list(ASPECT_ANGLES.values()))
+    allowed = np.array([ASPECT_ORBS[name] for name in ASPECT_ANGLES])
+    deviation = np.abs(separation[:, :, None] - angles)
+    deviation = np.where(deviation <= allowed, deviation, np.inf)
+    codes = deviation.argmin(axis=2)
+    orbs = deviation.min(axis=2)
+    codes = np.where(np.isfinite(orbs), codes, -1)
+    return codes, orbs
+
+
+def compute_chart_payloads_batch(jd_ut, lat, lon, full_names: Optional[List[str]] = None,
+                                 genders: Optional[List[str]] = None) -> List[dict]:
+    """Compute complete chart payloads (same shape as build_chart_payload) for many birth records."""
+    longitudes, cusps = compute_longitudes(jd_ut, lat, lon)
+    houses = assign_houses(longitudes, cusps)
+    aspect_codes, aspect_orbs = find_aspects(longitudes)
+    sign_idx = (longitudes // 30).astype(int)
+    cusp_sign_idx = (cusps // 30).astype(int)
+
+    aspect_names = list(ASPECT_ANGLES)
+    code_to_label = {code: label for label, code in ASPECT_OPTIONS if code}
+    sun, asc, moon = (EPHEMERIS_BODIES.index(b) for b in ("Sun", "AC", "Moon"))
+    placed = [col for col, body in enumerate(EPHEMERIS_BODIES) if body not in ("AC", "MC")]
+
+    payloads = []
+    for n in range(longitudes.shape[0]):
+        planet_sign_map = {
+            EPHEMERIS_BODIES[col]: {
+                "sign_gr": SIGNS_GR_LIST[sign_idx[n, col]],
+                "sign": SIGNS_GR_TO_EN[SIGNS_GR_LIST[sign_idx[n, col]]],
+            }
+            for col in placed
+        }
+        aspects_selected_ui = {}
+        orbs = {}
+        for k in np.flatnonzero(aspect_codes[n] >= 0):
+            i, j = ASPECT_PAIRS[k]
+            pair = (EPHEMERIS_BODIES[i], EPHEMERIS_BODIES[j])
+            aspects_selected_ui[pair] = code_to_label[aspect_names[aspect_codes[n, k]]]
+            orbs[pair] = round(float(aspect_orbs[n, k]), 2)
+
+        payloads.append(build_chart_payload(
+            full_names[n] if full_names else "",
+            genders[n] if genders else "",
+            SIGNS_GR_LIST[sign_idx[n, sun]],
+            SIGNS_GR_LIST[sign_idx[n, asc]],
+            SIGNS_GR_LIST[sign_idx[n, moon]],
+            {h + 1: SIGNS_GR_LIST[cusp_sign_idx[n, h]] for h in range(12)},
+            {EPHEMERIS_BODIES[col]: int(houses[n, col]) for col in placed},
+            planet_sign_map,
+            aspects_selected_ui,
+            aspect_orbs=orbs,
+        ))
+    return payloads
+
+
+def compute_chart_payload(birth: datetime, utc_offset_hours: float, lat: float, lon: float,
+                          full_name: str = "", gender: str = "") -> dict:
+    """Single-chart convenience wrapper around compute_chart_payloads_batch."""
+    jd = julian_day_ut(birth, utc_offset_hours)
+    return compute_chart_payloads_batch([jd], [lat], [lon], [full_name], [gender])[0]
+
+
+# ============ PROMPTS (STABLE PREFIX) ============
+# Ο provider κάνει cache στο μακρύτερο κοινό πρόθεμα των μηνυμάτων. Γι' αυτό όλες
+# οι γεννήτριες στέλνουν ΤΟ ΙΔΙΟ system prompt (με τις οδηγίες και των τριών
+# εργασιών) και ξεκινούν το user μήνυμα με τα δεδομένα του χάρτη. Ό,τι αλλάζει
+# ανά κλήση (αναφορά, ερωτήσεις, ζητούμενη εργασία) μπαίνει στο τέλος.
+SHARED_SYSTEM_PROMPT = """Είσαι έμπειρη, σύγχρονη ψυχολογική αστρολόγος.
+Θέλω να γράφεις ΠΑΝΤΑ σε καλή, καθαρή ελληνική γλώσσα.
+
+Σε κάθε μήνυμα λαμβάνεις πρώτα τα ΔΕΔΟΜΕΝΑ ΧΑΡΤΗ σε JSON με δομή γενέθλιου χάρτη: basic_info, houses, planets_in_houses και aspects.
+Ακολουθούν, όπου χρειάζεται, επιπλέον δεδομένα και στο τέλος η ΕΡΓΑΣΙΑ που ζητείται (Α, Β ή Γ).
+Εκτέλεσε ΜΟΝΟ την εργασία που ζητείται, ακολουθώντας τις οδηγίες της αντίστοιχης ενότητας παρακάτω.
+
+ΓΕΝΙΚΕΣ ΟΔΗΓΙΕΣ ΥΦΟΥΣ (για όλες τις εργασίες):
+- Γράψε σε απλή, καθαρή, σύγχρονη ελληνική γλώσσα.
+- Να είναι ζεστό, ενδυναμωτικό, με σεβασμό. Όχι μοιρολατρικό.
+- Μη χρησιμοποιείς τεχνική ορολογία χωρίς εξήγηση.
+- Μη μιλάς για καλό/κακό χάρτη. Μίλα για δυνατότητες, προκλήσεις και εξέλιξη.
 
+==================== ΕΡΓΑΣΙΑ Α – Προσωπική Έκθεση Γενέθλιου Χάρτη ====================
 Να ακολουθείς αυτή τη δομή αναφοράς:
 0. Μικρό κουτάκι με βασικά στοιχεία (Ήλιος, Ωροσκόπος, Σελήνη).
 
@@ -197,30 +575,481 @@ def generate_basic_report_with_openai(payload: dict) -> str:
 - Αν κάποιος πλανήτης δεν έχει καμία όψη στο JSON, μπορείς να παραλείψεις την υποενότητά του.
 - ΜΗΝ εφευρίσκεις επιπλέον όψεις· χρησιμοποίησε μόνο όσες υπάρχουν στη λίστα "aspects".
 
-ΓΕΝΙΚΕΣ ΟΔΗΓΙΕΣ ΥΦΟΥΣ:
-- Γράψε σε απλή, καθαρή, σύγχρονη ελληνική γλώσσα.
-- Να είναι ζεστό, ενδυναμωτικό, με σεβασμό. Όχι μοιρολατρικό.
-- Μη χρησιμοποιείς τεχνική ορολογία χωρίς εξήγηση.
-- Μη μιλάς για καλό/κακό χάρτη. Μίλα για δυνατότητες, προκλήσεις και εξέλιξη."""
+==================== ΕΡΓΑΣΙΑ Β – MASTER PROMPT Ερμηνεία Οίκων (1–12) ====================
+Ρόλος: Η δουλειά σου είναι να εξηγείς κάθε οίκο του γενέθλιου χάρτη σε μία παράγραφο, ζεστά, πρακτικά και ενδυναμωτικά, χωρίς φόβο και μοιρολατρία.
+Μετά τα δεδομένα χάρτη θα λάβεις ΔΕΔΟΜΕΝΑ ΟΙΚΩΝ: για κάθε οίκο house_number, house_theme, house_sign, house_ruler_planet, house_ruler_position, planets_in_house και major_aspects.
+
+Τι πρέπει να κάνεις για κάθε οίκο:
+1. Χρησιμοποίησε το house_theme και το house_number για να ξεκινήσεις με 1–2 προτάσεις που εξηγούν σε ποιο πεδίο της ζωής αναφέρεται ο οίκος.
+2. Με βάση το house_sign και τον house_ruler_planet μαζί με το house_ruler_position, περιέγραψε πώς εκφράζεται η ενέργεια αυτού του οίκου.
+3. Αν υπάρχουν planets_in_house, ενσωμάτωσε τους στο κείμενο: εξήγησε τι χρώμα δίνει κάθε πλανήτης στα θέματα του οίκου. Μην κάνεις λίστα· πες το σαν ιστορία.
+4. Χρησιμοποίησε τις major_aspects για να δώσεις 2–4 συγκεκριμένα παραδείγματα για το πώς βιώνει το άτομο αυτόν τον οίκο στην πράξη.
+   - ΜΗΝ γράφεις τεχνική γλώσσα του τύπου «τετράγωνο Άρη–Κρόνου». Μετέφρασε την ουσία της όψης σε απλή ψυχολογική/πρακτική γλώσσα.
+   - Αρμονικές όψεις (trine, sextile) = φυσικές διευκολύνσεις, ταλέντα, υποστήριξη.
+   - Δύσκολες όψεις (square, opposition) = προκλήσεις ή εσωτερικές συγκρούσεις που βοηθούν το άτομο να ωριμάσει.
+5. Σύνδεσε πάντα ό,τι περιγράφεις με το πραγματικό θέμα του οίκου.
+6. Κλείσε την παράγραφο με 1–2 προτάσεις θεραπευτικής/εξελικτικής κατεύθυνσης.
+
+Στυλ κειμένου:
+- Γράψε σε απλή, καθημερινή ελληνική, σαν να μιλάς σε φίλη που δεν ξέρει αστρολογία.
+- Απόφυγε τεχνικούς όρους. Αν χρειαστεί, εξήγησε το ψυχολογικό νόημα.
+- Κάθε οίκος είναι μία ενιαία παράγραφος, 5–8 προτάσεων, χωρίς bullets ή λίστες.
+- Ύφος ζεστό, ενθαρρυντικό, με κατανόηση. Μην γράφεις τρομακτικά ή απόλυτες φράσεις.
+- Στόχος: το άτομο να καταλάβει καλύτερα τον εαυτό του και να νιώσει ότι έχει επιλογές και δύναμη.
+
+Δομή απάντησης:
+ΟΙΚΟΣ 1
+[η παράγραφός σου]
+
+ΟΙΚΟΣ 2
+[η παράγραφός σου]
+
+... και ούτω καθεξής για όλους τους 12 οίκους.
+
+==================== ΕΡΓΑΣΙΑ Γ – Εξειδικευμένες Ερωτήσεις ====================
+Μετά τα δεδομένα χάρτη θα λάβεις:
+- ΜΙΑ ΑΝΑΛΥΤΙΚΗ ΑΝΑΦΟΡΑ που έχει ήδη δημιουργηθεί για αυτό το άτομο
+- Συγκεκριμένες ερωτήσεις από τον χρήστη
+
+ΚΡΙΣΙΜΟ: Η ανάλυσή σου ΠΡΕΠΕΙ να στηρίζεται στην υπάρχουσα αναφορά. Διάβασέ την προσεκτικά και χρησιμοποίησέ την ως βάση.
+
+ΟΔΗΓΙΕΣ:
+- Απάντησε ΜΟΝΟ στις ερωτήσεις που σου δίνονται
+- ΧΡΗΣΙΜΟΠΟΙΗΣΕ τα συμπεράσματα από την υπάρχουσα αναφορά
+- Αναφέρσου σε συγκεκριμένα σημεία από την αναφορά (π.χ. "Όπως είδαμε στην ανάλυση...")
+- Για την ερώτηση επαγγελμάτων: πρότεινε 5-7 ΣΥΓΚΕΚΡΙΜΕΝΑ επαγγέλματα (όχι γενικόλογα) με σύντομη αιτιολογία για το καθένα
+- Για κάθε ερώτηση, γράψε 2-4 παραγράφους με συγκεκριμένα παραδείγματα
+- Όχι μοιρολατρικό ύφος - εστίασε σε δυνατότητες και εξέλιξη"""
+
+
+def format_chart_block(payload: dict) -> str:
+    """Chart JSON that opens every user message; sort_keys keeps it byte-identical."""
+    return f"""ΔΕΔΟΜΕΝΑ ΧΑΡΤΗ:
+{json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True)}"""
+
+
+# ============ PROMPT CACHE STATS ============
+@st.cache_resource
+def _prompt_cache_store() -> Tuple[Dict[str, Dict[str, int]], threading.Lock]:
+    """Per-generator counters and their lock.
+
+    Το Streamlit ξανατρέχει το script σε κάθε rerun· ένα απλό global θα μηδενιζόταν,
+    ενώ το st.cache_resource κρατά τους μετρητές για όλη τη διεργασία.
+    """
+    return {}, threading.Lock()
+
+
+def record_prompt_cache_usage(generator: str, usage) -> None:
+    """Accumulate prompt and cached-prompt tokens reported by the provider."""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    counters, lock = _prompt_cache_store()
+    with lock:
+        stats = counters.setdefault(
+            generator, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        )
+        stats["calls"] += 1
+        stats["prompt_tokens"] += usage.prompt_tokens or 0
+        stats["cached_tokens"] += cached_tokens
+
+
+def prompt_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Snapshot of the per-generator counters."""
+    counters, lock = _prompt_cache_store()
+    with lock:
+        return {generator: dict(stats) for generator, stats in counters.items()}
+
 
-    user_prompt = f"""Παρακάτω είναι τα δεδομένα του χάρτη σε JSON.
-Να γράψεις την Προσωπική Έκθεση Γενέθλιου Χάρτη με όλες τις Ενότητες 0–3.
+def prompt_cache_hit_rates() -> Dict[str, float]:
+    """Share of prompt tokens served from the provider cache, per generator."""
+    return {
+        generator: stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        for generator, stats in prompt_cache_stats().items()
+    }
 
-{json.dumps(payload, ensure_ascii=False, indent=2)}"""
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+# ============ GENERATION CANCELLATION ============
+# Προθεσμία ανά κλήση μοντέλου (s), ανά γεννήτρια.
+OPENAI_CALL_TIMEOUT_S = {"basic": 180.0, "questions": 180.0, "houses": 300.0}
+OPENAI_DEFAULT_TIMEOUT_S = 180.0
+GENERATION_TICK_S = 0.25
+CANCELLED_STATUSES = ("cancelled", "timeout")
+
+
+def get_generation_scope() -> GenerationScope:
+    if st.session_state.get("generation_scope") is None:
+        st.session_state.generation_scope = GenerationScope()
+    return st.session_state.generation_scope
+
+
+@contextmanager
+def cancel_on_stop(token: GenerationToken, on_stop: Optional[Callable[[], None]] = None):
+    """Cancel token (and call on_stop) if Streamlit stops the script run (Stop, session shutdown).
+
+    Σε rerun η κλήση δεν ακυρώνεται: συνεχίζει στο background και το αποτέλεσμα
+    μένει στο st.cache_data· την ακυρώνει μόνο το GenerationScope.bind, αν το
+    επόμενο run φέρει άλλο χάρτη ή reset_counter.
+    """
+    try:
+        yield
+    except BaseException as e:
+        if StopException is not None and isinstance(e, StopException):
+            token.cancel("stopped")
+            if on_stop is not None:
+                on_stop()
+        raise
+
+
+def wait_for_generation(token: GenerationToken, fn: Callable[[], Optional[str]],
+                        on_stop: Optional[Callable[[], None]] = None) -> Optional[str]:
+    """Run fn in a worker thread while the script thread keeps reaching Streamlit yield points.
+
+    Μια κλήση μπλοκαρισμένη στο script thread δεν «βλέπει» rerun ή stop μέχρι να
+    τελειώσει. Εδώ το script thread ενημερώνει ανά GENERATION_TICK_S ένα placeholder·
+    κάθε st.* κλήση είναι σημείο όπου το Streamlit εφαρμόζει εκκρεμές rerun/stop.
+    """
+    ctx = get_script_run_ctx() if get_script_run_ctx else None
+
+    def attach_ctx():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    pool = ThreadPoolExecutor(max_workers=1, initializer=attach_ctx)
+    status = st.empty()
+    start = time.perf_counter()
+    try:
+        with cancel_on_stop(token, on_stop):
+            future = pool.submit(fn)
+            while not wait([future], timeout=GENERATION_TICK_S).done:
+                status.caption(f"⏱️ {time.perf_counter() - start:.0f}s")
+    finally:
+        # Χωρίς αναμονή: σε rerun η κλήση ολοκληρώνεται στο background.
+        pool.shutdown(wait=False)
+    status.empty()
+    return future.result()
+
+
+# ============ TELEMETRY ============
+TELEMETRY_DB_PATH = os.environ.get("ASTRO_TELEMETRY_DB", "astro_telemetry.sqlite3")
+TELEMETRY_MAX_ROWS = 50_000
+OPENAI_MODEL = "gpt-4o"
+OPENAI_MAX_RETRIES = 2
+# USD ανά 1M tokens.
+MODEL_PRICES_PER_1M = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+}
+RETRYABLE_OPENAI_ERRORS = (APIConnectionError, APITimeoutError, RateLimitError, InternalServerError)
+
+_telemetry_lock = threading.Lock()
+_telemetry_local = threading.local()
+
+
+def _telemetry_connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(TELEMETRY_DB_PATH, timeout=5)
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS llm_calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TEXT NOT NULL,
+            report_type TEXT NOT NULL,
+            chart_hash TEXT,
+            model TEXT,
+            cache_tier TEXT NOT NULL,
+            status TEXT NOT NULL,
+            ttft_ms REAL,
+            latency_ms REAL NOT NULL,
+            prompt_tokens INTEGER DEFAULT 0,
+            cached_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            retries INTEGER DEFAULT 0,
+            cost_usd REAL DEFAULT 0
+        )"""
     )
-    return response.choices[0].message.content
+    return conn
+
+
+def estimate_cost_usd(model: Optional[str], prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    # Το API επιστρέφει snapshot (π.χ. "gpt-4o-2024-08-06"), οπότε ταιριάζουμε με πρόθεμα.
+    matches = [name for name in MODEL_PRICES_PER_1M if (model or "").startswith(name)]
+    if not matches:
+        return 0.0
+    prices = MODEL_PRICES_PER_1M[max(matches, key=len)]
+    return (
+        (prompt_tokens - cached_tokens) * prices["input"]
+        + cached_tokens * prices["cached_input"]
+        + completion_tokens * prices["output"]
+    ) / 1_000_000
+
+
+def record_llm_call(report_type: str, chart_hash: Optional[str], cache_tier: str, latency_ms: float,
+                    status: str = "ok", model: Optional[str] = None, ttft_ms: Optional[float] = None,
+                    prompt_tokens: int = 0, cached_tokens: int = 0, completion_tokens: int = 0,
+                    retries: int = 0) -> None:
+    """Append one row to the SQLite ledger, keeping at most TELEMETRY_MAX_ROWS rows.
+
+    cache_tier: "app" (st.cache_data), "prefetch", "provider" (cached prompt tokens) ή "none".
+    status: "ok", "error", "cancelled" ή "timeout"· στα δύο τελευταία τα completion_tokens
+    είναι όσα chunks πρόλαβαν να φτάσουν πριν κλείσει το stream.
+    Η telemetry δεν πρέπει ποτέ να σπάει την αναφορά, οπότε τα σφάλματα αγνοούνται.
+    """
+    cost = estimate_cost_usd(model, prompt_tokens, cached_tokens, completion_tokens)
+    try:
+        with _telemetry_lock:
+            conn = _telemetry_connect()
+            with conn:
+                conn.execute(
+                    """INSERT INTO llm_calls (ts, report_type, chart_hash, model, cache_tier, status,
+                        ttft_ms, latency_ms, prompt_tokens, cached_tokens, completion_tokens, retries, cost_usd)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (datetime.now().isoformat(timespec="seconds"), report_type, chart_hash, model,
+                     cache_tier, status, ttft_ms, latency_ms, prompt_tokens, cached_tokens,
+                     completion_tokens, retries, cost),
+                )
+                conn.execute(
+                    "DELETE FROM llm_calls WHERE id <= (SELECT MAX(id) FROM llm_calls) - ?",
+                    (TELEMETRY_MAX_ROWS,),
+                )
+            conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def traced_generation(report_type: str, chart_hash: str, fn: Callable[..., str], *args,
+                      token: Optional[GenerationToken] = None) -> str:
+    """Call a cached generator and log an "app" cache hit when it did not reach the model.
+
+    Το token περνά στη call_openai_chat μέσω του thread-local, αφού δεν μπορεί να
+    γίνει όρισμα των st.cache_data συναρτήσεων.
+    """
+    _telemetry_local.model_called = False
+    _telemetry_local.token = token
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+    finally:
+        _telemetry_local.token = None
+    if not _telemetry_local.model_called:
+        record_llm_call(report_type, chart_hash, "app", (time.perf_counter() - start) * 1000)
+    return result
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def telemetry_summary() -> Dict[str, object]:
+    """Model-call latency percentiles and tokens per report type, and cost per chart, from the ledger."""
+    try:
+        with _telemetry_lock:
+            conn = _telemetry_connect()
+            rows = conn.execute(
+                """SELECT report_type, chart_hash, cache_tier, status, ttft_ms, latency_ms,
+                    prompt_tokens, completion_tokens, cost_usd FROM llm_calls"""
+            ).fetchall()
+            conn.close()
+    except sqlite3.Error:
+        rows = []
+
+    by_type: Dict[str, List[tuple]] = {}
+    cost_by_chart: Dict[str, float] = {}
+    for row in rows:
+        by_type.setdefault(row[0], []).append(row)
+        if row[1]:
+            cost_by_chart[row[1]] = cost_by_chart.get(row[1], 0.0) + (row[8] or 0.0)
+
+    per_type = []
+    for report_type, type_rows in sorted(by_type.items()):
+        hit_rows = [r for r in type_rows if r[2] in ("app", "prefetch") and r[3] == "ok"]
+        model_rows = [r for r in type_rows if r[2] not in ("app", "prefetch") and r[3] == "ok"]
+        cancelled_rows = [r for r in type_rows if r[3] in CANCELLED_STATUSES]
+        error_rows = [r for r in type_rows if r[3] == "error"]
+        # Μόνο πραγματικές κλήσεις στο μοντέλο· τα cache hits (~0 ms) θα έριχναν τα percentiles.
+        latencies = [r[5] for r in model_rows]
+        avg_completion = sum(r[7] for r in model_rows) / len(model_rows) if model_rows else 0
+        # Εξοικονόμηση: η μέση πλήρης απάντηση του τύπου μείον όσα tokens είχαν ήδη παραχθεί.
+        tokens_saved = sum(max(0, avg_completion - (r[7] or 0)) for r in cancelled_rows)
+        ttfts = [r[4] for r in model_rows if r[4] is not None]
+        per_type.append({
+            "report_type": report_type,
+            "calls": len(type_rows),
+            "model_calls": len(model_rows),
+            "cache_hits": len(hit_rows),
+            "errors": len(error_rows),
+            "cancelled": len(cancelled_rows),
+            "tokens_saved": round(tokens_saved),
+            "p50_latency_ms": round(_percentile(latencies, 50)),
+            "p95_latency_ms": round(_percentile(latencies, 95)),
+            "p50_ttft_ms": round(_percentile(ttfts, 50)),
+            "avg_prompt_tokens": round(sum(r[6] for r in model_rows) / len(model_rows)) if model_rows else 0,
+            "avg_completion_tokens": round(avg_completion),
+            "cost_usd": round(sum(r[8] or 0.0 for r in type_rows), 4),
+        })
+
+    chart_costs = list(cost_by_chart.values())
+    return {
+        "per_type": per_type,
+        "charts": len(chart_costs),
+        "avg_cost_per_chart_usd": round(sum(chart_costs) / len(chart_costs), 4) if chart_costs else 0.0,
+        "max_cost_per_chart_usd": round(max(chart_costs), 4) if chart_costs else 0.0,
+        "cancelled_calls": sum(row["cancelled"] for row in per_type),
+        "tokens_saved": sum(row["tokens_saved"] for row in per_type),
+    }
+
+
+def call_openai_chat(client: OpenAI, generator: str, user_prompt: str, chart_hash: Optional[str] = None) -> str:
+    """Send SHARED_SYSTEM_PROMPT + user_prompt, streaming so time-to-first-token can be measured.
+
+    Οι επαναλήψεις γίνονται εδώ (όχι μέσα στον client) ώστε να καταγράφεται
+    ο αριθμός τους στο ledger. Κάθε κλήση έχει προθεσμία OPENAI_CALL_TIMEOUT_S και
+    ελέγχει το GenerationToken του thread σε κάθε chunk· σε ακύρωση κλείνει το stream,
+    ώστε να ελευθερωθούν η σύνδεση και το slot του rate limit.
+    """
+    _telemetry_local.model_called = True
+    token = getattr(_telemetry_local, "token", None) or GenerationToken()
+    client = client.with_options(max_retries=0)
+    start = time.perf_counter()
+    deadline = start + OPENAI_CALL_TIMEOUT_S.get(generator, OPENAI_DEFAULT_TIMEOUT_S)
+    retries = 0
+    ttft = None
+    parts = []
+    while True:
+        try:
+            token.check(deadline)
+            stream = client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": SHARED_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt},
+                ],
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=max(0.1, deadline - time.perf_counter()),
+            )
+            ttft = None
+            parts = []
+            usage = None
+            model = OPENAI_MODEL
+            with stream:
+                for chunk in stream:
+                    token.check(deadline)
+                    model = chunk.model or model
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        parts.append(chunk.choices[0].delta.content)
+            break
+        except GenerationCancelled as e:
+            record_llm_call(generator, chart_hash, "none", (time.perf_counter() - start) * 1000,
+                            status="timeout" if e.reason == "deadline" else "cancelled",
+                            model=OPENAI_MODEL, ttft_ms=ttft * 1000 if ttft is not None else None,
+                            completion_tokens=len(parts), retries=retries)
+            raise
+        except RETRYABLE_OPENAI_ERRORS:
+            if time.perf_counter() >= deadline:
+                continue  # το token.check καταγράφει timeout
+            if retries >= OPENAI_MAX_RETRIES:
+                record_llm_call(generator, chart_hash, "none", (time.perf_counter() - start) * 1000,
+                                status="error", model=OPENAI_MODEL, retries=retries)
+                raise
+            retries += 1
+            token.wait(min(0.5 * 2 ** retries, 8.0, max(0.0, deadline - time.perf_counter())))
+        except Exception:
+            if time.perf_counter() >= deadline:
+                continue
+            record_llm_call(generator, chart_hash, "none", (time.perf_counter() - start) * 1000,
+                            status="error", model=OPENAI_MODEL, retries=retries)
+            raise
+
+    record_prompt_cache_usage(generator, usage)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    record_llm_call(
+        generator, chart_hash, "provider" if cached_tokens else "none",
+        (time.perf_counter() - start) * 1000,
+        model=model,
+        ttft_ms=ttft * 1000 if ttft is not None else None,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        cached_tokens=cached_tokens,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        retries=retries,
+    )
+    return "".join(parts)
+
+
+# ============ REPORT ARCHIVE ============
+def _archive_seed() -> bytes:
+    """Static Greek text the reports echo: prompt instructions, house themes, questions, names."""
+    parts = [SHARED_SYSTEM_PROMPT]
+    parts += [f"ΟΙΚΟΣ {n}\n{theme}" for n, theme in HOUSE_THEMES.items()]
+    parts += list(PREDEFINED_QUESTIONS.values())
+    parts += [f"{gr} στον {sign}" for gr, _ in PLANETS for sign in SIGNS_GR_LIST]
+    return "\n\n".join(parts).encode()
+
+
+REPORT_ARCHIVE = get_archive("reports", _archive_seed())
+
+
+def archive_report(chart_hash: str, report_type: str, text: Optional[str]) -> Optional[ReportRef]:
+    if text is None:
+        return None
+    return REPORT_ARCHIVE.put(chart_hash, report_type, text)
+
+
+def load_report(ref: Optional[ReportRef]) -> Optional[str]:
+    return REPORT_ARCHIVE.get(ref) if ref is not None else None
+
+
+def store_session_report(name: str, text: Optional[str]) -> None:
+    """Keep a report in st.session_state as a ReportRef into REPORT_ARCHIVE."""
+    payload = st.session_state.get("payload")
+    chart_hash = compute_payload_hash(payload) if payload else ""
+    st.session_state[name] = archive_report(chart_hash, name, text)
+
+
+def session_report(name: str) -> Optional[str]:
+    return load_report(st.session_state.get(name))
 
 
+# ============ OPENAI FUNCTIONS (CACHED) ============
+# Τα caches κρατούν μόνο ReportRef· το κείμενο ζει συμπιεσμένο στο REPORT_ARCHIVE.
 @st.cache_data(show_spinner=False)
+def _generate_basic_report_archived(payload_hash: str, payload: dict) -> ReportRef:
+    return archive_report(payload_hash, "basic_report", generate_basic_report_with_openai(payload))
+
+
+def generate_basic_report_cached(payload_hash: str, payload: dict) -> str:
+    return load_report(_generate_basic_report_archived(payload_hash, payload))
+
+
+def generate_basic_report_with_openai(payload: dict) -> str:
+    client = get_openai_client()
+    if client is None:
+        return "⚠️ Δεν βρέθηκε OPENAI_API_KEY στο περιβάλλον."
+
+    user_prompt = f"""{format_chart_block(payload)}
+
+---
+
+ΕΡΓΑΣΙΑ Α: Να γράψεις την Προσωπική Έκθεση Γενέθλιου Χάρτη με όλες τις Ενότητες 0–3."""
+
+    return call_openai_chat(client, "basic", user_prompt, compute_payload_hash(payload))
+
+
+@st.cache_data(show_spinner=False)
+def _generate_houses_analysis_archived(payload_hash: str, payload: dict) -> ReportRef:
+    return archive_report(payload_hash, "houses_report", generate_houses_analysis_with_openai(payload))
+
+
 def generate_houses_analysis_cached(payload_hash: str, payload: dict) -> str:
-    return generate_houses_analysis_with_openai(payload)
+    return load_report(_generate_houses_analysis_archived(payload_hash, payload))
 
 
 def generate_houses_analysis_with_openai(payload: dict) -> str:
@@ -265,7 +1094,7 @@ def generate_houses_analysis_with_openai(payload: dict) -> str:
                     "from": aspect["p1"],
                     "to": aspect["p2"],
                     "type": aspect["aspect"],
-                    "orb": 2  # Default orb
+                    "orb": aspect.get("orb", 2)  # 2 για χειροκίνητες όψεις χωρίς γνωστό orb
                 })
 
         houses_data.append({
@@ -278,54 +1107,36 @@ def generate_houses_analysis_with_openai(payload: dict) -> str:
             "major_aspects": major_aspects,
         })
 
-    system_prompt = """MASTER PROMPT – Ερμηνεία Οίκων (1–12)
+    user_prompt = f"""{format_chart_block(payload)}
 
-Ρόλος: Είσαι μια έμπειρη, σύγχρονη ψυχολογική αστρολόγος.
-Η δουλειά σου είναι να εξηγείς έναν συγκεκριμένο οίκο του γενέθλιου χάρτη σε μία παράγραφο, ζεστά, πρακτικά και ενδυναμωτικά, χωρίς φόβο και μοιρολατρία.
+---
 
-Τι πρέπει να κάνεις:
-1. Χρησιμοποίησε το house_theme και το house_number για να ξεκινήσεις με 1–2 προτάσεις που εξηγούν σε ποιο πεδίο της ζωής αναφέρεται ο οίκος.
-2. Με βάση το house_sign και τον house_ruler_planet μαζί με το house_ruler_position, περιέγραψε πώς εκφράζεται η ενέργεια αυτού του οίκου.
-3. Αν υπάρχουν planets_in_house, ενσωμάτωσε τους στο κείμενο: εξήγησε τι χρώμα δίνει κάθε πλανήτης στα θέματα του οίκου. Μην κάνεις λίστα· πες το σαν ιστορία.
-4. Χρησιμοποίησε τις major_aspects για να δώσεις 2–4 συγκεκριμένα παραδείγματα για το πώς βιώνει το άτομο αυτόν τον οίκο στην πράξη.
-   - ΜΗΝ γράφεις τεχνική γλώσσα του τύπου «τετράγωνο Άρη–Κρόνου». Μετέφρασε την ουσία της όψης σε απλή ψυχολογική/πρακτική γλώσσα.
-   - Αρμονικές όψεις (trine, sextile) = φυσικές διευκολύνσεις, ταλέντα, υποστήριξη.
-   - Δύσκολες όψεις (square, opposition) = προκλήσεις ή εσωτερικές συγκρούσεις που βοηθούν το άτομο να ωριμάσει.
-5. Σύνδεσε πάντα ό,τι περιγράφεις με το πραγματικό θέμα του οίκου.
-6. Κλείσε την παράγραφο με 1–2 προτάσεις θεραπευτικής/εξελικτικής κατεύθυνσης.
+ΔΕΔΟΜΕΝΑ ΟΙΚΩΝ:
+{json.dumps(houses_data, ensure_ascii=False, indent=2)}
 
-Στυλ κειμένου:
-- Γράψε σε απλή, καθημερινή ελληνική, σαν να μιλάς σε φίλη που δεν ξέρει αστρολογία.
-- Απόφυγε τεχνικούς όρους. Αν χρειαστεί, εξήγησε το ψυχολογικό νόημα.
-- Η απάντηση πρέπει να είναι μία ενιαία παράγραφος, 5–8 προτάσεων, χωρίς τίτλους, bullets ή λίστες.
-- Ύφος ζεστό, ενθαρρυντικό, με κατανόηση. Μην γράφεις τρομακτικά ή απόλυτες φράσεις.
-- Στόχος: το άτομο να καταλάβει καλύτερα τον εαυτό του και να νιώσει ότι έχει επιλογές και δύναμη."""
+---
 
-    user_prompt = f"""Θα σου δώσω δεδομένα για ΟΛΟΥΣ τους 12 οίκους. Για κάθε οίκο, γράψε ΜΙΑ παράγραφο (5-8 προτάσεις) σύμφωνα με το MASTER PROMPT.
+ΕΡΓΑΣΙΑ Β: Για κάθε έναν από τους 12 οίκους, γράψε ΜΙΑ παράγραφο (5-8 προτάσεις) σύμφωνα με το MASTER PROMPT."""
 
-Δομή απάντησης:
-ΟΙΚΟΣ 1
-[η παράγραφός σου]
+    return call_openai_chat(client, "houses", user_prompt, compute_payload_hash(payload))
 
-ΟΙΚΟΣ 2
-[η παράγραφός σου]
 
-... και ούτω καθεξής για όλους τους 12 οίκους.
-
-Δεδομένα:
-{json.dumps(houses_data, ensure_ascii=False, indent=2)}"""
-
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+@st.cache_data(show_spinner=False)
+def _generate_custom_analysis_archived(
+    payload_hash: str,
+    questions_hash: str,
+    report_hash: str,
+    payload: dict,
+    questions: List[str],
+    basic_report: str
+) -> ReportRef:
+    # Οι παράμετροι hash χρησιμοποιούνται μόνο για να δημιουργούν μοναδικό cache key.
+    return archive_report(
+        payload_hash, "questions_report",
+        generate_custom_analysis_with_openai(payload, questions, basic_report),
     )
-    return response.choices[0].message.content
 
 
-@st.cache_data(show_spinner=False)
 def generate_custom_analysis_cached(
     payload_hash: str,
     questions_hash: str,
@@ -334,8 +1145,9 @@ def generate_custom_analysis_cached(
     questions: List[str],
     basic_report: str
 ) -> str:
-    # Οι παράμετροι hash χρησιμοποιούνται μόνο για να δημιουργούν μοναδικό cache key.
-    return generate_custom_analysis_with_openai(payload, questions, basic_report)
+    return load_report(_generate_custom_analysis_archived(
+        payload_hash, questions_hash, report_hash, payload, questions, basic_report
+    ))
 
 
 def generate_custom_analysis_with_openai(payload: dict, questions: List[str], basic_report: str) -> str:
@@ -345,46 +1157,300 @@ def generate_custom_analysis_with_openai(payload: dict, questions: List[str], ba
 
     questions_text = "\n".join([f"{i+1}. {q}" for i, q in enumerate(questions)])
 
-    system_prompt = """Είσαι έμπειρη αστρολόγος.
-Λαμβάνεις:
-- Ένα JSON με γενέθλιο χάρτη (basic_info, houses, planets_in_houses, aspects)
-- ΜΙΑ ΑΝΑΛΥΤΙΚΗ ΑΝΑΦΟΡΑ που έχει ήδη δημιουργηθεί για αυτό το άτομο
-- Συγκεκριμένες ερωτήσεις από τον χρήστη
-
-ΚΡΙΣΙΜΟ: Η ανάλυσή σου ΠΡΕΠΕΙ να στηρίζεται στην υπάρχουσα αναφορά. Διάβασέ την προσεκτικά και χρησιμοποίησέ την ως βάση.
-
-ΟΔΗΓΙΕΣ:
-- Απάντησε ΜΟΝΟ στις ερωτήσεις που σου δίνονται
-- ΧΡΗΣΙΜΟΠΟΙΗΣΕ τα συμπεράσματα από την υπάρχουσα αναφορά
-- Αναφέρσου σε συγκεκριμένα σημεία από την αναφορά (π.χ. "Όπως είδαμε στην ανάλυση...")
-- Για την ερώτηση επαγγελμάτων: πρότεινε 5-7 ΣΥΓΚΕΚΡΙΜΕΝΑ επαγγέλματα (όχι γενικόλογα) με σύντομη αιτιολογία για το καθένα
-- Γράψε σε απλή, ζεστή, ενδυναμωτική ελληνική γλώσσα
-- Για κάθε ερώτηση, γράψε 2-4 παραγράφους με συγκεκριμένα παραδείγματα
-- Όχι μοιρολατρικό ύφος - εστίασε σε δυνατότητες και εξέλιξη"""
-
-    user_prompt = f"""ΥΠΑΡΧΟΥΣΑ ΑΝΑΛΥΤΙΚΗ ΑΝΑΦΟΡΑ ΓΙΑ ΤΟ ΑΤΟΜΟ:
-{basic_report}
+    # Χάρτης → αναφορά → ερωτήσεις: κλήσεις με διαφορετικές ερωτήσεις για τον ίδιο
+    # χάρτη μοιράζονται όλο το πρόθεμα μέχρι και την αναφορά.
+    user_prompt = f"""{format_chart_block(payload)}
 
 ---
 
-ΔΕΔΟΜΕΝΑ ΧΑΡΤΗ (για αναφορά):
-{json.dumps(payload, ensure_ascii=False, indent=2)}
+ΥΠΑΡΧΟΥΣΑ ΑΝΑΛΥΤΙΚΗ ΑΝΑΦΟΡΑ ΓΙΑ ΤΟ ΑΤΟΜΟ:
+{basic_report}
 
 ---
 
-ΕΡΩΤΗΣΕΙΣ ΠΡΟΣ ΑΠΑΝΤΗΣΗ:
+ΕΡΓΑΣΙΑ Γ – ΕΡΩΤΗΣΕΙΣ ΠΡΟΣ ΑΠΑΝΤΗΣΗ:
 {questions_text}
 
 Να απαντήσεις με βάση την υπάρχουσα αναφορά και τον χάρτη. Κάνε αναφορές σε συγκεκριμένα σημεία από την ανάλυση."""
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-    )
-    return response.choices[0].message.content
+    return call_openai_chat(client, "questions", user_prompt, compute_payload_hash(payload))
+
+
+# ============ REPORT PIPELINE ============
+def run_report_graph(
+    tasks: Dict[str, Tuple[Tuple[str, ...], Callable[[Dict[str, str]], str]]],
+    on_result: Callable[[str, Optional[str], Optional[Exception]], None],
+    max_workers: int = 3,
+    on_tick: Optional[Callable[[], None]] = None,
+) -> Dict[str, str]:
+    """Run report generations concurrently, respecting their dependencies.
+
+    Κάθε task είναι (dependencies, fn). Η fn ξεκινά μόλις ολοκληρωθούν όλες οι
+    εξαρτήσεις της και λαμβάνει dict με τα αποτελέσματά τους. Η on_result
+    καλείται στο κύριο thread για κάθε αποτέλεσμα μόλις φτάσει, ώστε να
+    ενημερώνεται το st.session_state. Αν μια εξάρτηση αποτύχει, τα tasks που
+    εξαρτώνται από αυτή δεν εκτελούνται. Η on_tick καλείται στο κύριο thread ανά
+    GENERATION_TICK_S όσο περιμένουμε (βλ. wait_for_generation).
+    """
+    ctx = get_script_run_ctx() if get_script_run_ctx else None
+
+    def attach_ctx():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    results: Dict[str, str] = {}
+    errors: Dict[str, Exception] = {}
+    pending = dict(tasks)
+    running: Dict[Future, str] = {}
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, initializer=attach_ctx)
+    try:
+        def submit_ready():
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, (deps, fn) in list(pending.items()):
+                    failed = [d for d in deps if d in errors]
+                    if failed:
+                        del pending[name]
+                        errors[name] = RuntimeError(f"Απέτυχε η εξάρτηση: {', '.join(failed)}")
+                        on_result(name, None, errors[name])
+                        progressed = True
+                    elif all(d in results for d in deps):
+                        del pending[name]
+                        running[pool.submit(fn, {d: results[d] for d in deps})] = name
+
+        submit_ready()
+        if pending and not running:
+            raise ValueError(f"Άγνωστες ή κυκλικές εξαρτήσεις: {', '.join(pending)}")
+
+        while running:
+            done, _ = wait(running, timeout=GENERATION_TICK_S, return_when=FIRST_COMPLETED)
+            if not done and on_tick is not None:
+                on_tick()
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+                    on_result(name, None, e)
+                else:
+                    on_result(name, results[name], None)
+            submit_ready()
+            if pending and not running:
+                raise ValueError(f"Άγνωστες ή κυκλικές εξαρτήσεις: {', '.join(pending)}")
+    finally:
+        # Σε rerun/stop δεν περιμένουμε όσα τρέχουν· ή τελειώνουν στο background ή τα ακυρώνει το token τους.
+        pool.shutdown(wait=False)
+
+    return results
+
+
+def build_full_report_tasks(payload: dict, questions: List[str],
+                            token: Optional[GenerationToken] = None) -> Dict[str, tuple]:
+    """Dependency graph for the one-click full report.
+
+    Η βασική αναφορά και η ανάλυση οίκων ξεκινούν μαζί· οι ερωτήσεις περιμένουν
+    μόνο τη βασική αναφορά.
+    """
+    payload_hash = compute_payload_hash(payload)
+    questions_hash = compute_questions_hash(questions)
+
+    def basic(_deps):
+        return traced_generation("basic", payload_hash, generate_basic_report_cached, payload_hash, payload,
+                                 token=token)
+
+    def houses(_deps):
+        return traced_generation("houses", payload_hash, generate_houses_analysis_cached, payload_hash, payload,
+                                 token=token)
+
+    def custom(deps):
+        basic_report = deps["basic"]
+        report_hash = hashlib.sha256(basic_report.encode()).hexdigest()
+        return traced_generation(
+            "questions", payload_hash, generate_custom_analysis_cached,
+            payload_hash, questions_hash, report_hash, payload, questions, basic_report,
+            token=token,
+        )
+
+    tasks = {
+        "basic": ((), basic),
+        "houses": ((), houses),
+    }
+    if questions:
+        tasks["questions"] = (("basic",), custom)
+    return tasks
+
+
+# ============ SPECULATIVE PREFETCH ============
+SPECULATIVE_DEFAULT_MAX_CALLS = 8
+SPECULATIVE_DEFAULT_CONCURRENCY = 2
+
+
+class SpeculativePrefetcher:
+    """Per-session background warm-up of the houses and predefined-question caches.
+
+    Ζει στο st.session_state. Κάθε κλήση δεσμεύει budget (max_calls της
+    συνεδρίας) μόλις μπει στην ουρά· όσες ακυρωθούν πριν ξεκινήσουν το
+    επιστρέφουν. Η ταυτόχρονη εκτέλεση περιορίζεται από το max_concurrency.
+    Όταν αλλάξει ο χάρτης ή λήξει η συνεδρία, οι εκκρεμείς κλήσεις ακυρώνονται
+    και όσες τρέχουν ήδη διακόπτονται μέσω του GenerationToken τους.
+    """
+
+    def __init__(self, max_calls: int = SPECULATIVE_DEFAULT_MAX_CALLS,
+                 max_concurrency: int = SPECULATIVE_DEFAULT_CONCURRENCY,
+                 previous: Optional["SpeculativePrefetcher"] = None):
+        """previous: prefetcher της ίδιας συνεδρίας που αντικαθίσταται· κρατάμε τα stats (και το budget) του."""
+        self.max_calls = max_calls
+        self.max_concurrency = max_concurrency
+        self.chart_hash: Optional[str] = None
+        self.futures: Dict[str, Future] = {}
+        self.tokens: List[GenerationToken] = []
+        if previous is not None:
+            # Κοινό lock: οι κλήσεις του παλιού που ακόμα τρέχουν ενημερώνουν τα ίδια stats.
+            self.stats = previous.stats
+            self._lock = previous._lock
+        else:
+            self.stats = {"submitted": 0, "used": 0, "cancelled": 0, "failed": 0}
+            # RLock: το done-callback τρέχει συγχρονισμένα μέσα στο future.cancel().
+            self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="astro-prefetch"
+        )
+        # Η συνεδρία έληξε (το session_state απελευθερώθηκε): σταματάμε τις εκκρεμείς κλήσεις.
+        weakref.finalize(self, self._executor.shutdown, wait=False, cancel_futures=True)
+
+    @property
+    def remaining_calls(self) -> int:
+        return max(0, self.max_calls - self.stats["submitted"])
+
+    def start(self, chart_hash: str, jobs: Dict[str, Callable[[], str]],
+              token: Optional[GenerationToken] = None) -> None:
+        """Submit jobs for a chart, cancelling any speculation for a previous chart.
+
+        token: το token που χρησιμοποιούν τα jobs· ακυρώνεται μαζί με αυτά.
+        """
+        with self._lock:
+            if chart_hash != self.chart_hash:
+                self._cancel_locked()
+                self.chart_hash = chart_hash
+            if token is not None:
+                self.tokens.append(token)
+            for key, job in jobs.items():
+                if key in self.futures or self.remaining_calls == 0:
+                    continue
+                self.futures[key] = future = self._executor.submit(job)
+                self.stats["submitted"] += 1
+                future.add_done_callback(functools.partial(self._on_done, key))
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            future = self.futures.get(key)
+        return future is not None and not self._was_cancelled(future)
+
+    def take(self, key: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Return a prefetched result (waiting for it if still running), or None."""
+        with self._lock:
+            future = self.futures.get(key)
+        if future is None or future.cancelled():
+            return None
+        try:
+            result = future.result(timeout=timeout)
+        except GenerationCancelled:
+            # Ακυρώθηκε (π.χ. reset/αλλαγή χάρτη)· μετρήθηκε ήδη στο _on_done.
+            with self._lock:
+                self.futures.pop(key, None)
+            return None
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+                self.futures.pop(key, None)
+            return None
+        with self._lock:
+            if self.futures.pop(key, None) is not None:
+                self.stats["used"] += 1
+        return result
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancel_locked()
+            self.chart_hash = None
+
+    def _cancel_locked(self) -> None:
+        for token in self.tokens:
+            token.cancel("prefetch_cancelled")
+        self.tokens.clear()
+        for future in self.futures.values():
+            # Όσα δεν ξεκίνησαν ακυρώνονται εδώ· όσα τρέχουν, από το token.
+            future.cancel()
+        self.futures.clear()
+
+    @staticmethod
+    def _was_cancelled(future: Future) -> bool:
+        if future.cancelled():
+            return True
+        return future.done() and isinstance(future.exception(), GenerationCancelled)
+
+    def _on_done(self, key: str, future: Future) -> None:
+        # Μοναδικό σημείο μέτρησης: ακυρώσεις από εδώ, από το GenerationScope ή από deadline.
+        if future.cancelled():
+            # Δεν ξεκίνησε ποτέ: επιστρέφουμε το budget αντί να το μετρήσουμε ως ακύρωση.
+            with self._lock:
+                self.stats["submitted"] -= 1
+        elif self._was_cancelled(future):
+            with self._lock:
+                self.stats["cancelled"] += 1
+                # Φεύγει από τα futures ώστε ένα επόμενο start() να το ξαναστείλει.
+                if self.futures.get(key) is future:
+                    del self.futures[key]
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def hit_rate(self) -> float:
+        submitted = self.stats["submitted"] - self.stats["cancelled"]
+        return self.stats["used"] / submitted if submitted else 0.0
+
+
+def prefetch_key(kind: str, *parts: str) -> str:
+    return ":".join((kind,) + parts)
+
+
+def build_prefetch_jobs(payload: dict, basic_report: str,
+                        token: Optional[GenerationToken] = None) -> Dict[str, Callable[[], str]]:
+    """Houses analysis plus one job per predefined question, keyed for SpeculativePrefetcher."""
+    payload_hash = compute_payload_hash(payload)
+    report_hash = hashlib.sha256(basic_report.encode()).hexdigest()
+
+    jobs = {
+        prefetch_key("houses", payload_hash):
+            lambda: traced_generation(
+                "houses", payload_hash, generate_houses_analysis_cached, payload_hash, payload, token=token
+            ),
+    }
+    for question in PREDEFINED_QUESTIONS.values():
+        questions_hash = compute_questions_hash([question])
+        jobs[prefetch_key("question", payload_hash, report_hash, questions_hash)] = (
+            lambda q=question, qh=questions_hash: traced_generation(
+                "questions", payload_hash, generate_custom_analysis_cached,
+                payload_hash, qh, report_hash, payload, [q], basic_report, token=token
+            )
+        )
+    return jobs
+
+
+def get_prefetcher(max_calls: int, max_concurrency: int) -> SpeculativePrefetcher:
+    """Return the session's prefetcher, recreating it (same stats) if the concurrency budget changed."""
+    prefetcher = st.session_state.get("prefetcher")
+    if prefetcher is None or prefetcher.max_concurrency != max_concurrency:
+        if prefetcher is not None:
+            prefetcher.shutdown()
+        prefetcher = SpeculativePrefetcher(max_calls, max_concurrency, previous=prefetcher)
+        st.session_state.prefetcher = prefetcher
+    prefetcher.max_calls = max_calls
+    return prefetcher
 
 
 # ============ PDF GENERATION ============
@@ -465,81 +1531,115 @@ def create_pdf(payload: dict, basic_report: str, questions_report: Optional[str]
     return buffer
 
 
-# ============ MAIN UI ============
-def main():
-    st.set_page_config(page_title="Γενέθλιος Χάρτης", layout="wide")
-    st.title("🪷 Προσωπική Έκθεση Γενέθλιου Χάρτη")
+# ============ CHART ENTRY FRAGMENTS ============
+def apply_computed_chart(payload: dict, rc: int) -> None:
+    """Fill the chart-entry widgets from a payload computed by the ephemeris engine.
 
-    st.markdown("""
-    **✨ Απλοποιημένη Έκδοση:**
-    - ✅ **Caching** για γρήγορη επανάληψη
-    - ✅ **Validation** warnings για ελλιπή δεδομένα
-    - ✅ **Αριθμημένες όψεις** στο UI
-    - ✅ **2 κουμπιά**: Βασική Αναφορά & Εξειδικευμένες Ερωτήσεις (με βάση την αναφορά)
-    """)
+    Πρέπει να κληθεί πριν δημιουργηθούν τα widgets των ενοτήτων 0–3 στο τρέχον run.
+    """
+    basic = payload["basic_info"]
+    st.session_state[f"sun_sign_{rc}"] = basic["sun_sign_gr"]
+    st.session_state[f"asc_sign_{rc}"] = basic["asc_sign_gr"]
+    st.session_state[f"moon_sign_{rc}"] = basic["moon_sign_gr"]
 
-    if "reset_counter" not in st.session_state:
-        st.session_state.reset_counter = 0
-    if "basic_report" not in st.session_state:
-        st.session_state.basic_report = None
-    if "payload" not in st.session_state:
-        st.session_state.payload = None
-    if "questions_report" not in st.session_state:
-        st.session_state.questions_report = None
-    if "houses_report" not in st.session_state:
-        st.session_state.houses_report = None
+    for house in payload["houses"]:
+        if house["house"] > 1:
+            st.session_state[f"house_{house['house']}_{rc}"] = house["sign_gr"]
+
+    for i in range(1, 13):
+        st.session_state[f"house_planets_{i}_{rc}"] = [
+            p["planet_gr"] for p in payload["planets_in_houses"] if p["house"] == i
+        ]
+    computed_planet_signs = {}
+    for p in payload["planets_in_houses"]:
+        key = f"planet_sign_{p['planet']}_house_{p['house']}_{rc}"
+        st.session_state[key] = p["sign_gr"]
+        computed_planet_signs[key] = p["sign_gr"]
+    st.session_state.computed_planet_signs = computed_planet_signs
+
+    for i, j in ASPECT_PAIRS:
+        st.session_state[f"aspect_{PLANETS[i][1]}_{PLANETS[j][1]}_{rc}"] = ASPECT_OPTIONS[0][0]
+    computed_aspects = {}
+    for aspect in payload["aspects"]:
+        st.session_state[f"aspect_{aspect['p1']}_{aspect['p2']}_{rc}"] = aspect["aspect_label_gr"]
+        computed_aspects[(aspect["p1"], aspect["p2"])] = (aspect["aspect_label_gr"], aspect["orb"])
+    st.session_state.computed_aspects = computed_aspects
+
+
+@st.fragment
+def render_chart_entry(rc: int) -> None:
+    """Sections -1 to 2 of the chart entry; interactions here rerun only this fragment.
+
+    Οι πλανήτες της ενότητας 2 εξαρτώνται από τις ακμές της ενότητας 1, οπότε ζουν
+    στο ίδιο fragment και κάθε αλλαγή εφαρμόζεται αμέσως. Τα αποτελέσματα γράφονται
+    στο st.session_state (chart_basics, houses_signs_gr και όσα γράφει η ενότητα 2).
+    """
+    house1_key = f"house_1_{rc}"
+    st.session_state[house1_key] = st.session_state.get(f"asc_sign_{rc}", SIGNS_WITH_EMPTY[0])
 
-    # ============ SECTION -1: NAME & GENDER ============
     st.header("📝 Στοιχεία Ατόμου")
     col_name, col_gender = st.columns([2, 1])
     with col_name:
         full_name = st.text_input(
             "Ονοματεπώνυμο",
-            key=f"full_name_{st.session_state.reset_counter}",
+            key=f"full_name_{rc}",
             placeholder="π.χ. Μαρία Παπαδοπούλου"
         )
     with col_gender:
         gender = st.radio(
             "Φύλο",
             options=["Άνδρας", "Γυναίκα"],
-            key=f"gender_{st.session_state.reset_counter}",
+            key=f"gender_{rc}",
             horizontal=True
         )
 
-    # ============ SECTION 0: BASIC INFO ============
     st.header("0. Βασικά στοιχεία χάρτη")
     col1, col2, col3 = st.columns(3)
     with col1:
         sun_sign_gr = st.selectbox("Ζώδιο Ηλίου", SIGNS_WITH_EMPTY, index=0,
-            key=f"sun_sign_{st.session_state.reset_counter}")
+            key=f"sun_sign_{rc}")
     with col2:
         asc_sign_gr = st.selectbox("Ωροσκόπος", SIGNS_WITH_EMPTY, index=0,
-            key=f"asc_sign_{st.session_state.reset_counter}")
+            key=f"asc_sign_{rc}")
     with col3:
         moon_sign_gr = st.selectbox("Ζώδιο Σελήνης", SIGNS_WITH_EMPTY, index=0,
-            key=f"moon_sign_{st.session_state.reset_counter}")
+            key=f"moon_sign_{rc}")
 
-    # ============ SECTION 1: HOUSES ============
     st.header("1. Ενότητα 1 – Ακμές οίκων")
     st.markdown("Διάβασε από τον χάρτη σου σε ποιο ζώδιο ξεκινά κάθε οίκος (1–12).")
 
-    houses_signs_gr = {}
-    house1_key = f"house_1_{st.session_state.reset_counter}"
-    st.session_state[house1_key] = asc_sign_gr if asc_sign_gr in SIGNS_WITH_EMPTY else SIGNS_WITH_EMPTY[0]
-
     cols = st.columns(4)
     for i in range(1, 13):
         col = cols[(i - 1) % 4]
         with col:
             if i == 1:
-                sign = st.selectbox("Οίκος 1 (ίδιος με Ωροσκόπο)", SIGNS_WITH_EMPTY,
+                st.selectbox("Οίκος 1 (ίδιος με Ωροσκόπο)", SIGNS_WITH_EMPTY,
                     key=house1_key, disabled=True)
             else:
-                sign = st.selectbox(f"Οίκος {i}", SIGNS_WITH_EMPTY,
-                    key=f"house_{i}_{st.session_state.reset_counter}")
-        houses_signs_gr[i] = sign
+                st.selectbox(f"Οίκος {i}", SIGNS_WITH_EMPTY,
+                    key=f"house_{i}_{rc}")
+
+    houses_signs_gr = memoize_in_session(
+        "houses_signs_gr",
+        (rc, asc_sign_gr) + tuple(st.session_state.get(f"house_{i}_{rc}") for i in range(2, 13)),
+        lambda: {
+            i: asc_sign_gr if i == 1 else st.session_state.get(f"house_{i}_{rc}", "---")
+            for i in range(1, 13)
+        },
+    )
+
+    render_planets_section(rc, houses_signs_gr)
+    st.session_state.chart_basics = (full_name, gender, sun_sign_gr, asc_sign_gr, moon_sign_gr)
+    st.session_state.houses_signs_gr = houses_signs_gr
+
+
+def render_planets_section(rc: int, houses_signs_gr: Dict[int, str]) -> None:
+    """Section 2 of the chart entry, rendered inside render_chart_entry.
 
-    # ============ SECTION 2: PLANETS IN HOUSES ============
+    Οι επιλογές κάθε multiselect εξαρτώνται από τους προηγούμενους οίκους, οπότε
+    η ενότητα δεν μπορεί να γίνει φόρμα. Τα αποτελέσματα γράφονται στο
+    st.session_state (house_planets_map, planet_house_map, planet_sign_map).
+    """
     st.header("2. Ενότητα 2 – Πλανήτες σε οίκους")
     st.markdown("Για κάθε οίκο, διάλεξε ποιοι πλανήτες βρίσκονται μέσα.")
 
@@ -559,20 +1659,24 @@ def main():
             selected_planets_gr = st.multiselect(
                 f"Πλανήτες στον Οίκο {i}",
                 available_planets,
-                key=f"house_planets_{i}_{st.session_state.reset_counter}",
+                key=f"house_planets_{i}_{rc}",
             )
         house_planets_map[i] = selected_planets_gr
 
-    planet_house_map = {}
-    for house_num, planets_gr_list in house_planets_map.items():
-        for gr_name in planets_gr_list:
-            en_name = next(en for (gr, en) in PLANETS if gr == gr_name)
-            planet_house_map[en_name] = house_num
+    planet_house_map = memoize_in_session(
+        "planet_house_map",
+        tuple((house, tuple(planets)) for house, planets in house_planets_map.items()),
+        lambda: {
+            next(en for (gr, en) in PLANETS if gr == gr_name): house_num
+            for house_num, planets_gr_list in house_planets_map.items()
+            for gr_name in planets_gr_list
+        },
+    )
 
     st.markdown("#### Ζώδιο κάθε πλανήτη μέσα στον οίκο του")
     st.markdown("Για κάθε πλανήτη, διάλεξε το ζώδιο του (προηγούμενο/ίδιο/επόμενο από την ακμή).")
 
-    planet_sign_map = {}
+    selected_signs_gr = {}
     for gr_name, en_name in [(gr, en) for (gr, en) in PLANETS if en in planet_house_map]:
         house_num = planet_house_map[en_name]
         cusp_sign_gr = houses_signs_gr.get(house_num, "---")
@@ -586,64 +1690,214 @@ def main():
             options = SIGNS_WITH_EMPTY
             default_index = 0
 
-        selected_sign_gr = st.selectbox(
+        key = f"planet_sign_{en_name}_house_{house_num}_{rc}"
+        # Υπολογισμένο ζώδιο εκτός των γειτονικών (π.χ. εγκλεισμένο ζώδιο): το προσθέτουμε.
+        # Μια χειροκίνητη επιλογή που έπαψε να γειτονεύει με την ακμή σβήνεται, ώστε το
+        # selectbox να επιστρέψει στο default_index (ζώδιο της ακμής), όπως πριν.
+        current_sign = st.session_state.get(key)
+        if current_sign is not None and current_sign not in options:
+            if current_sign == st.session_state.get("computed_planet_signs", {}).get(key) \
+                    and current_sign in SIGNS_GR_LIST:
+                options = options + [current_sign]
+            else:
+                del st.session_state[key]
+
+        selected_signs_gr[en_name] = st.selectbox(
             label,
             options,
             index=default_index,
-            key=f"planet_sign_{en_name}_house_{house_num}_{st.session_state.reset_counter}",
+            key=key,
         )
 
-        if selected_sign_gr in SIGNS_GR_TO_EN:
-            planet_sign_map[en_name] = {
-                "sign_gr": selected_sign_gr,
-                "sign": SIGNS_GR_TO_EN[selected_sign_gr],
-            }
-        else:
-            planet_sign_map[en_name] = {"sign_gr": None, "sign": None}
+    planet_sign_map = memoize_in_session(
+        "planet_sign_map",
+        tuple(selected_signs_gr.items()),
+        lambda: {
+            en_name: {"sign_gr": sign_gr, "sign": SIGNS_GR_TO_EN[sign_gr]}
+            if sign_gr in SIGNS_GR_TO_EN else {"sign_gr": None, "sign": None}
+            for en_name, sign_gr in selected_signs_gr.items()
+        },
+    )
+
+    st.session_state.house_planets_map = house_planets_map
+    st.session_state.planet_house_map = planet_house_map
+    st.session_state.planet_sign_map = planet_sign_map
+
+
+# ============ MAIN UI ============
+def main():
+    st.set_page_config(page_title="Γενέθλιος Χάρτης", layout="wide")
+    st.title("🪷 Προσωπική Έκθεση Γενέθλιου Χάρτη")
+
+    st.markdown("""
+    **✨ Απλοποιημένη Έκδοση:**
+    - ✅ **Caching** για γρήγορη επανάληψη
+    - ✅ **Validation** warnings για ελλιπή δεδομένα
+    - ✅ **Αριθμημένες όψεις** στο UI
+    - ✅ **Γρήγορη καταχώριση**: οι ενότητες 0–2 ξανασχεδιάζονται μόνες τους· οι όψεις καταχωρίζονται με το κουμπί αναφοράς
+    - ✅ **Κουμπιά αναφοράς**: Βασική Αναφορά, Ερωτήσεις (με βάση την αναφορά), Ανάλυση Οίκων ή όλα μαζί με την Πλήρη Αναφορά
+    """)
 
-    # ============ SECTION 3: ASPECTS ============
+    if "reset_counter" not in st.session_state:
+        st.session_state.reset_counter = 0
+    if "basic_report" not in st.session_state:
+        st.session_state.basic_report = None
+    if "payload" not in st.session_state:
+        st.session_state.payload = None
+    if "questions_report" not in st.session_state:
+        st.session_state.questions_report = None
+    if "houses_report" not in st.session_state:
+        st.session_state.houses_report = None
+
+    rc = st.session_state.reset_counter
+
+    # ============ BIRTH DATA → COMPUTED CHART (OPTIONAL) ============
+    with st.expander("🔭 Υπολογισμός χάρτη από στοιχεία γέννησης (τοπικά, χωρίς internet)", expanded=False):
+        with st.form(key=f"birth_data_form_{rc}", border=False):
+            col_d, col_t, col_tz = st.columns(3)
+            with col_d:
+                birth_date = st.date_input("Ημερομηνία γέννησης", value=date(1990, 1, 1),
+                    min_value=date(1800, 1, 1), max_value=date(2050, 12, 31), key=f"birth_date_{rc}")
+            with col_t:
+                birth_time = st.time_input("Ώρα γέννησης (τοπική)", value=dt_time(12, 0),
+                    step=60, key=f"birth_time_{rc}")
+            with col_tz:
+                utc_offset = st.number_input("Διαφορά από UTC (ώρες)", min_value=-12.0, max_value=14.0,
+                    value=2.0, step=0.5, key=f"utc_offset_{rc}")
+            col_lat, col_lon = st.columns(2)
+            with col_lat:
+                birth_lat = st.number_input("Γεωγραφικό πλάτος (°Β)", min_value=-90.0, max_value=90.0,
+                    value=37.98, format="%.4f", key=f"birth_lat_{rc}")
+            with col_lon:
+                birth_lon = st.number_input("Γεωγραφικό μήκος (°Α)", min_value=-180.0, max_value=180.0,
+                    value=23.73, format="%.4f", key=f"birth_lon_{rc}")
+            st.caption("Placidus οίκοι, τροπικός ζωδιακός, μέσος Βόρειος Δεσμός. "
+                "Οι φόρμες παρακάτω συμπληρώνονται αυτόματα και μπορούν να διορθωθούν.")
+            compute_chart = st.form_submit_button("🔭 Υπολογισμός χάρτη", type="primary")
+
+    if compute_chart:
+        computed = compute_chart_payload(
+            datetime.combine(birth_date, birth_time), utc_offset, birth_lat, birth_lon
+        )
+        apply_computed_chart(computed, rc)
+        st.success("✅ Ο χάρτης υπολογίστηκε· έλεγξε τις ενότητες 0–3 παρακάτω.")
+
+    # ============ SECTIONS -1 TO 2: PERSON, BASIC INFO, HOUSES, PLANETS (FRAGMENT) ============
+    render_chart_entry(rc)
+    full_name, gender, sun_sign_gr, asc_sign_gr, moon_sign_gr = st.session_state.chart_basics
+    houses_signs_gr = st.session_state.houses_signs_gr
+    planet_house_map = st.session_state.planet_house_map
+    planet_sign_map = st.session_state.planet_sign_map
+
+    # ============ SECTION 3 & ACTIONS: ASPECTS + REPORT BUTTONS (FORM) ============
+    # Οι όψεις δεν ξανατρέχουν το script· καταχωρίζονται μαζί με όποιο κουμπί αναφοράς πατηθεί,
+    # ώστε να μην υπάρχει δεύτερο σημείο καταχώρισης που μπορεί να ξεχαστεί.
     st.header("3. Ενότητα 3 – Όψεις ανάμεσα σε πλανήτες")
     st.markdown("💡 **Tip:** Κάντε κλικ στο βέλος για να ανοίξετε κάθε ομάδα όψεων.")
 
     aspect_labels = [opt[0] for opt in ASPECT_OPTIONS]
-    label_to_code = {opt[0]: opt[1] for opt in ASPECT_OPTIONS}
 
     aspects_selected_ui = {}
 
-    for i, (gr1, en1) in enumerate(PLANETS):
-        if gr1 in ("AC", "MC"):
-            continue
+    with st.form(key=f"report_form_{rc}", border=False):
+        for i, (gr1, en1) in enumerate(PLANETS):
+            if gr1 in ("AC", "MC"):
+                continue
 
-        with st.expander(f"**Όψεις {gr1}** 🔽", expanded=False):
-            pair_index = 1
+            with st.expander(f"**Όψεις {gr1}** 🔽", expanded=False):
+                pair_index = 1
+
+                for j in range(i + 1, len(PLANETS)):
+                    gr2, en2 = PLANETS[j]
+                    label_text = f"**{pair_index}.** {gr1} – {gr2}"
+                    key = f"aspect_{en1}_{en2}_{rc}"
+
+                    choice = st.selectbox(
+                        label_text,
+                        aspect_labels,
+                        key=key
+                    )
+                    aspects_selected_ui[(en1, en2)] = choice
+                    pair_index += 1
+
+        # ============ QUESTION SELECTION ============
+        # Μέσα στη φόρμα: σχεδιάζεται σε κάθε run, οπότε η επιλογή δεν χάνεται και την
+        # βλέπουν τόσο το «Ερωτήσεις» όσο και η «Πλήρης Αναφορά».
+        with st.expander("💎 Επιλογή Ερωτήσεων", expanded=False):
+            st.markdown("**Α) Προκαθορισμένες Ερωτήσεις** - Διάλεξε όσες σε ενδιαφέρουν:")
+            selected_questions = [
+                question for key, question in PREDEFINED_QUESTIONS.items()
+                if st.checkbox(question, key=f"q_{key}_{rc}")
+            ]
+
+            st.markdown("**Β) Προσαρμοσμένες Ερωτήσεις** - Γράψε τις δικές σου ερωτήσεις (μία ανά γραμμή):")
+            custom_questions_text = st.text_area(
+                "Οι δικές σου ερωτήσεις:",
+                height=150,
+                key=f"custom_q_{rc}",
+                placeholder="Παράδειγμα:\nΠώς επηρεάζει ο Κρόνος την καριέρα μου;\nΤι σημαίνει ο Άρης στον 7ο οίκο για τις σχέσεις μου;\nΠοια είναι η σχέση μου με το χρήμα;"
+            )
+            selected_questions.extend(
+                line.strip() for line in custom_questions_text.splitlines() if line.strip()
+            )
 
-            for j in range(i + 1, len(PLANETS)):
-                gr2, en2 = PLANETS[j]
-                label_text = f"**{pair_index}.** {gr1} – {gr2}"
-                key = f"aspect_{en1}_{en2}_{st.session_state.reset_counter}"
+        # ============ ACTION BUTTONS ============
+        st.markdown("---")
+        st.subheader("📊 Δημιουργία Αναφοράς")
+        st.caption("Κάθε κουμπί καταχωρίζει και τις αλλαγές στις όψεις και στις ερωτήσεις.")
 
-                choice = st.selectbox(
-                    label_text, 
-                    aspect_labels, 
-                    key=key
-                )
-                aspects_selected_ui[(en1, en2)] = choice
-                pair_index += 1
+        col_btn1, col_btn2, col_btn3 = st.columns(3)
 
-    # ============ ACTION BUTTONS ============
-    st.markdown("---")
-    st.subheader("📊 Δημιουργία Αναφοράς")
+        with col_btn1:
+            generate_basic = st.form_submit_button("🔍 Βασική Αναφορά (Ενότητες 0–3)", type="primary",
+                                                   use_container_width=True)
 
-    col_btn1, col_btn2, col_btn3 = st.columns(3)
+        with col_btn2:
+            generate_questions = st.form_submit_button("💎 Ερωτήσεις", type="secondary", use_container_width=True)
 
-    with col_btn1:
-        generate_basic = st.button("🔍 Βασική Αναφορά (Ενότητες 0–3)", type="primary", use_container_width=True)
+        with col_btn3:
+            generate_houses = st.form_submit_button("🏠 Ανάλυση Οίκων (1-12)", type="secondary",
+                                                    use_container_width=True)
 
-    with col_btn2:
-        generate_questions = st.button("💎 Ερωτήσεις", type="secondary", use_container_width=True)
+        generate_full = st.form_submit_button(
+            "🚀 Πλήρης Αναφορά (Βασική + Οίκοι + Ερωτήσεις ταυτόχρονα)",
+            type="primary", use_container_width=True,
+        )
 
-    with col_btn3:
-        generate_houses = st.button("🏠 Ανάλυση Οίκων (1-12)", type="secondary", use_container_width=True)
+    # Πραγματικά orbs μόνο για όψεις που έμειναν όπως τις υπολόγισε η μηχανή εφημερίδων.
+    aspect_orbs = {
+        pair: orb for pair, (label, orb) in st.session_state.get("computed_aspects", {}).items()
+        if aspects_selected_ui.get(pair) == label
+    }
+
+    # Επανεκκίνηση ή αλλαγή χάρτη: ό,τι τρέχει ακόμη για τα προηγούμενα στοιχεία ακυρώνεται.
+    generation_scope = get_generation_scope()
+    generation_scope.bind(rc, compute_inputs_hash(
+        full_name, gender, sun_sign_gr, asc_sign_gr, moon_sign_gr,
+        houses_signs_gr, planet_house_map, planet_sign_map, aspects_selected_ui,
+    ))
+
+    with st.expander("⚙️ Προφόρτωση στο παρασκήνιο (speculative prefetch)", expanded=False):
+        speculative_enabled = st.checkbox(
+            "Μετά τη Βασική Αναφορά, προετοίμασε στο παρασκήνιο Ανάλυση Οίκων και προκαθορισμένες ερωτήσεις",
+            key="speculative_enabled",
+        )
+        speculative_max_calls = st.number_input(
+            "Μέγιστος αριθμός κλήσεων προφόρτωσης ανά συνεδρία", min_value=0, max_value=50,
+            value=SPECULATIVE_DEFAULT_MAX_CALLS, key="speculative_max_calls",
+        )
+        speculative_concurrency = st.number_input(
+            "Ταυτόχρονες κλήσεις προφόρτωσης", min_value=1, max_value=8,
+            value=SPECULATIVE_DEFAULT_CONCURRENCY, key="speculative_concurrency",
+        )
+        prefetcher = st.session_state.get("prefetcher")
+        if prefetcher is not None:
+            st.caption(
+                f"Κλήσεις: {prefetcher.stats['submitted']}/{prefetcher.max_calls} | "
+                f"Χρησιμοποιήθηκαν: {prefetcher.stats['used']} | "
+                f"Ακυρώθηκαν: {prefetcher.stats['cancelled']} | "
+                f"Ποσοστό αξιοποίησης: {prefetcher.hit_rate():.0%}"
+            )
 
     # ============ BASIC REPORT PROCESSING ============
     if generate_basic:
@@ -651,62 +1905,11 @@ def main():
             st.error("⚠️ Παρακαλώ συμπλήρωσε Ζώδιο Ηλίου, Ωροσκόπο και Ζώδιο Σελήνης!")
             return
 
-        basic_info = {
-            "full_name": full_name.strip(),
-            "gender": gender,
-            "sun_sign_gr": sun_sign_gr, 
-            "sun_sign": SIGNS_GR_TO_EN[sun_sign_gr],
-            "asc_sign_gr": asc_sign_gr, 
-            "asc_sign": SIGNS_GR_TO_EN[asc_sign_gr],
-            "moon_sign_gr": moon_sign_gr, 
-            "moon_sign": SIGNS_GR_TO_EN[moon_sign_gr],
-        }
-
-        houses = []
-        for house_num, sign_gr in houses_signs_gr.items():
-            if sign_gr == "---":
-                continue
-            sign_en = SIGNS_GR_TO_EN[sign_gr]
-            ruler_en = SIGN_RULERS.get(sign_en)
-            ruler_gr = PLANET_EN_TO_GR.get(ruler_en, ruler_en) if ruler_en else None
-            ruler_in_house = planet_house_map.get(ruler_en)
-            houses.append({
-                "house": house_num, "sign_gr": sign_gr, "sign": sign_en,
-                "ruler": ruler_en, "ruler_gr": ruler_gr, "ruler_in_house": ruler_in_house,
-            })
-
-        planets_in_houses = []
-        for en_name, house_num in planet_house_map.items():
-            gr_name = next(gr for gr, en in PLANETS if en == en_name)
-            sign_info = planet_sign_map.get(en_name, {})
-            planets_in_houses.append(
-                {
-                    "planet": en_name,
-                    "planet_gr": gr_name,
-                    "house": house_num,
-                    "sign_gr": sign_info.get("sign_gr"),
-                    "sign": sign_info.get("sign"),
-                }
-            )
-
-        aspects = []
-        for (p1, p2), label in aspects_selected_ui.items():
-            code = label_to_code.get(label)
-            if code is None:
-                continue
-            gr1 = next(gr for gr, en in PLANETS if en == p1)
-            gr2 = next(gr for gr, en in PLANETS if en == p2)
-            aspects.append({
-                "p1": p1, "p1_gr": gr1, "p2": p2, "p2_gr": gr2,
-                "aspect": code, "aspect_label_gr": label,
-            })
-
-        payload = {
-            "basic_info": basic_info,
-            "houses": houses,
-            "planets_in_houses": planets_in_houses,
-            "aspects": aspects,
-        }
+        payload = build_chart_payload(
+            full_name, gender, sun_sign_gr, asc_sign_gr, moon_sign_gr,
+            houses_signs_gr, planet_house_map, planet_sign_map, aspects_selected_ui,
+            aspect_orbs=aspect_orbs,
+        )
 
         warnings = validate_chart_data(payload)
         if warnings:
@@ -722,10 +1925,13 @@ def main():
 
         st.subheader("🤖 Βασική Αναφορά με OpenAI")
         with st.spinner("⏳ Καλώ το μοντέλο... (με caching)"):
+            token = generation_scope.token()
             try:
-                report_text = generate_basic_report_cached(payload_hash, payload)
-                st.session_state.basic_report = report_text
+                report_text = wait_for_generation(token, lambda: traced_generation(
+                    "basic", payload_hash, generate_basic_report_cached, payload_hash, payload, token=token
+                ))
                 st.session_state.payload = payload
+                store_session_report("basic_report", report_text)
             except Exception as e:
                 report_text = f"Σφάλμα: {e}"
 
@@ -735,6 +1941,96 @@ def main():
 
         st.success("✅ Η αναφορά ολοκληρώθηκε!")
 
+        if speculative_enabled and session_report("basic_report") == report_text:
+            prefetcher = get_prefetcher(int(speculative_max_calls), int(speculative_concurrency))
+            prefetch_token = generation_scope.token()
+            prefetcher.start(payload_hash, build_prefetch_jobs(payload, report_text, prefetch_token), prefetch_token)
+        elif st.session_state.get("prefetcher") is not None:
+            st.session_state.prefetcher.cancel()
+
+    # ============ FULL REPORT PIPELINE ============
+    if generate_full:
+        if sun_sign_gr == "---" or asc_sign_gr == "---" or moon_sign_gr == "---":
+            st.error("⚠️ Παρακαλώ συμπλήρωσε Ζώδιο Ηλίου, Ωροσκόπο και Ζώδιο Σελήνης!")
+            return
+
+        payload = build_chart_payload(
+            full_name, gender, sun_sign_gr, asc_sign_gr, moon_sign_gr,
+            houses_signs_gr, planet_house_map, planet_sign_map, aspects_selected_ui,
+            aspect_orbs=aspect_orbs,
+        )
+
+        warnings = validate_chart_data(payload)
+        if warnings:
+            st.warning("### ⚠️ Προειδοποιήσεις")
+            for warning in warnings:
+                st.markdown(f"- {warning}")
+            st.markdown("---")
+
+        # Χωρίς επιλεγμένες ερωτήσεις τρέχουν μόνο βασική αναφορά και οίκοι.
+        full_questions = list(selected_questions)
+        if not full_questions:
+            st.info("💡 Δεν επιλέχθηκε καμία ερώτηση· οι ερωτήσεις παραλείπονται. "
+                    "Διάλεξε από το «💎 Επιλογή Ερωτήσεων» πριν από την πλήρη αναφορά.")
+
+        # Νέος χάρτης: οι παλιές αναφορές δεν ισχύουν πλέον.
+        if st.session_state.get("prefetcher") is not None:
+            st.session_state.prefetcher.cancel()
+        st.session_state.payload = payload
+        st.session_state.basic_report = None
+        st.session_state.questions_report = None
+        st.session_state.houses_report = None
+
+        st.subheader("🚀 Πλήρης Αναφορά")
+        slots = {
+            "basic": ("### 📜 Αναφορά Γενέθλιου Χάρτη (Ενότητες 0–3)", "basic_report", st.empty()),
+            "houses": ("### 🏛️ Ανάλυση Οίκων", "houses_report", st.empty()),
+        }
+        if full_questions:
+            slots["questions"] = ("### 💫 Απαντήσεις", "questions_report", st.empty())
+        for title, _, slot in slots.values():
+            slot.info(f"⏳ {title.lstrip('# ')}...")
+        pdf_slot = st.empty()
+
+        def on_result(name: str, text: Optional[str], error: Optional[Exception]):
+            title, state_key, slot = slots[name]
+            if error is not None:
+                slot.error(f"{title.lstrip('# ')} – Σφάλμα: {error}")
+                return
+            store_session_report(state_key, text)
+            with slot.container():
+                st.markdown(title)
+                st.write(text)
+            if st.session_state.basic_report:
+                pdf_buffer = create_pdf(
+                    st.session_state.payload,
+                    session_report("basic_report"),
+                    session_report("questions_report"),
+                    session_report("houses_report")
+                )
+                pdf_slot.download_button(
+                    "📥 Κατέβασμα ενδιάμεσου PDF",
+                    data=pdf_buffer,
+                    file_name=f"astro_partial_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                    mime="application/pdf",
+                    key=f"partial_pdf_{name}_{st.session_state.reset_counter}",
+                    # Χωρίς rerun: αλλιώς το κλικ διακόπτει το run και τα επόμενα αποτελέσματα χάνονται.
+                    on_click="ignore",
+                )
+
+        tick_slot = st.empty()
+        start = time.perf_counter()
+        token = generation_scope.token()
+        with st.spinner("⏳ Βασική αναφορά και οίκοι τρέχουν παράλληλα..."), cancel_on_stop(token):
+            run_report_graph(
+                build_full_report_tasks(payload, full_questions, token), on_result,
+                on_tick=lambda: tick_slot.caption(f"⏱️ {time.perf_counter() - start:.0f}s"),
+            )
+        tick_slot.empty()
+
+        pdf_slot.empty()
+        st.success("✅ Η πλήρης αναφορά ολοκληρώθηκε!")
+
     # ============ MEGA PDF DOWNLOAD BUTTON ============
     if st.session_state.basic_report:
         st.markdown("---")
@@ -748,15 +2044,20 @@ def main():
 
         st.markdown(f"**Το PDF θα περιλαμβάνει:** {' | '.join(sections_included)}")
 
-        pdf_buffer = create_pdf(
-            st.session_state.payload,
-            st.session_state.basic_report,
-            st.session_state.questions_report,
-            st.session_state.houses_report
+        # Το PDF ξαναφτιάχνεται μόνο όταν αλλάξει κάποια αναφορά, όχι σε κάθε rerun.
+        pdf_bytes = memoize_in_session(
+            "full_report_pdf",
+            tuple(st.session_state.get(name) for name in ("basic_report", "questions_report", "houses_report")),
+            lambda: create_pdf(
+                st.session_state.payload,
+                session_report("basic_report"),
+                session_report("questions_report"),
+                session_report("houses_report")
+            ).getvalue(),
         )
         st.download_button(
             "📥 Κατέβασμα Πλήρους Αναφοράς (PDF)", 
-            data=pdf_buffer,
+            data=pdf_bytes,
             file_name=f"astro_full_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
             mime="application/pdf",
             use_container_width=True
@@ -769,55 +2070,71 @@ def main():
             st.info("👆 Πάτησε το κουμπί 'Δημιουργία Βασικής Αναφοράς' πρώτα.")
             return
 
-        st.subheader("💎 Επιλογή Ερωτήσεων")
-
-        st.markdown("**Α) Προκαθορισμένες Ερωτήσεις** - Διάλεξε όσες σε ενδιαφέρουν:")
-        selected_questions = []
-        for key, question in PREDEFINED_QUESTIONS.items():
-            if st.checkbox(question, key=f"q_{key}_{st.session_state.reset_counter}"):
-                selected_questions.append(question)
-
-        st.markdown("---")
-        st.markdown("**Β) Προσαρμοσμένες Ερωτήσεις** - Γράψε τις δικές σου ερωτήσεις (μία ανά γραμμή):")
-        custom_questions_text = st.text_area(
-            "Οι δικές σου ερωτήσεις:",
-            height=150,
-            key=f"custom_q_{st.session_state.reset_counter}",
-            placeholder="Παράδειγμα:\nΠώς επηρεάζει ο Κρόνος την καριέρα μου;\nΤι σημαίνει ο Άρης στον 7ο οίκο για τις σχέσεις μου;\nΠοια είναι η σχέση μου με το χρήμα;"
-        )
-
-        # Parse custom questions
-        if custom_questions_text.strip():
-            custom_lines = [line.strip() for line in custom_questions_text.strip().splitlines() if line.strip()]
-            selected_questions.extend(custom_lines)
+        st.subheader("💎 Επιλεγμένες Ερωτήσεις")
 
         if not selected_questions:
-            st.info("💡 Δεν επιλέχθηκε καμία ερώτηση. Επίλεξε από τις προκαθορισμένες ή γράψε δικές σου.")
+            st.info("💡 Δεν επιλέχθηκε καμία ερώτηση. Άνοιξε το «💎 Επιλογή Ερωτήσεων» πάνω από τα κουμπιά, "
+                    "επίλεξε από τις προκαθορισμένες ή γράψε δικές σου και πάτησε ξανά «Ερωτήσεις».")
             return
 
-        st.markdown("---")
         st.markdown(f"**Σύνολο Ερωτήσεων: {len(selected_questions)}**")
         for i, q in enumerate(selected_questions, 1):
             st.markdown(f"{i}. {q}")
 
-        questions_hash = hashlib.sha256(
-            json.dumps(selected_questions, sort_keys=True, ensure_ascii=False).encode()
-        ).hexdigest()
-        report_hash = hashlib.sha256(st.session_state.basic_report.encode()).hexdigest()
+        questions_hash = compute_questions_hash(selected_questions)
+        basic_report = session_report("basic_report")
+        report_hash = hashlib.sha256(basic_report.encode()).hexdigest()
         payload_hash = compute_payload_hash(st.session_state.payload)
 
         st.markdown("---")
         st.subheader("🤖 Εξειδικευμένη Ανάλυση")
+        prefetcher = st.session_state.get("prefetcher")
+        keys = [
+            prefetch_key("question", payload_hash, report_hash, compute_questions_hash([q]))
+            for q in selected_questions
+        ]
+        predefined = set(PREDEFINED_QUESTIONS.values())
+        use_prefetch = (
+            prefetcher is not None and prefetcher.chart_hash == payload_hash
+            and all(q in predefined for q in selected_questions) and all(map(prefetcher.has, keys))
+        )
+
+        def take_prefetched() -> Optional[str]:
+            answers = []
+            for q, key in zip(selected_questions, keys):
+                answer = prefetcher.take(key)
+                if answer is None:
+                    return None
+                answers.append(f"**{q}**\n\n{answer}")
+            return "\n\n".join(answers)
+
         with st.spinner("⏳ Αναλύω με βάση την αναφορά σου..."):
             try:
-                analysis_text = generate_custom_analysis_cached(
-                    payload_hash, 
-                    questions_hash, 
-                    report_hash,
-                    st.session_state.payload, 
-                    selected_questions,
-                    st.session_state.basic_report
-                )
+                analysis_text = None
+                if use_prefetch:
+                    # Η προφόρτωση μπορεί να τρέχει ακόμη· περιμένουμε χωρίς να μπλοκάρουμε το script thread.
+                    wait_start = time.perf_counter()
+                    analysis_text = wait_for_generation(
+                        generation_scope.token(), take_prefetched, on_stop=prefetcher.cancel
+                    )
+                    if analysis_text is not None:
+                        record_llm_call("questions", payload_hash, "prefetch",
+                                        (time.perf_counter() - wait_start) * 1000)
+                if analysis_text is None:
+                    token = generation_scope.token()
+                    questions_payload = st.session_state.payload
+                    analysis_text = wait_for_generation(token, lambda: traced_generation(
+                        "questions",
+                        payload_hash,
+                        generate_custom_analysis_cached,
+                        payload_hash,
+                        questions_hash,
+                        report_hash,
+                        questions_payload,
+                        selected_questions,
+                        basic_report,
+                        token=token,
+                    ))
             except Exception as e:
                 analysis_text = f"Σφάλμα: {e}"
 
@@ -825,7 +2142,7 @@ def main():
         st.write(analysis_text)
 
         # Save to session state
-        st.session_state.questions_report = analysis_text
+        store_session_report("questions_report", analysis_text)
 
         st.success("✅ Η ανάλυση ολοκληρώθηκε!")
 
@@ -843,7 +2160,24 @@ def main():
 
         with st.spinner("⏳ Δημιουργώ εις βάθος ανάλυση για κάθε οίκο..."):
             try:
-                houses_text = generate_houses_analysis_cached(payload_hash, st.session_state.payload)
+                prefetcher = st.session_state.get("prefetcher")
+                houses_text = None
+                if prefetcher is not None and prefetcher.chart_hash == payload_hash:
+                    wait_start = time.perf_counter()
+                    houses_text = wait_for_generation(
+                        generation_scope.token(), lambda: prefetcher.take(prefetch_key("houses", payload_hash)),
+                        on_stop=prefetcher.cancel,
+                    )
+                    if houses_text is not None:
+                        record_llm_call("houses", payload_hash, "prefetch",
+                                        (time.perf_counter() - wait_start) * 1000)
+                if houses_text is None:
+                    token = generation_scope.token()
+                    houses_payload = st.session_state.payload
+                    houses_text = wait_for_generation(token, lambda: traced_generation(
+                        "houses", payload_hash, generate_houses_analysis_cached,
+                        payload_hash, houses_payload, token=token
+                    ))
             except Exception as e:
                 houses_text = f"Σφάλμα: {e}"
 
@@ -851,19 +2185,70 @@ def main():
         st.write(houses_text)
 
         # Save to session state
-        st.session_state.houses_report = houses_text
+        store_session_report("houses_report", houses_text)
 
         st.success("✅ Η ανάλυση των οίκων ολοκληρώθηκε!")
 
     st.markdown("---")
     if st.button("🔄 Επανεκκίνηση (μηδενισμός όλων)"):
         st.session_state.reset_counter += 1
+        st.session_state.computed_aspects = {}
+        st.session_state.computed_planet_signs = {}
+        generation_scope.cancel_all("reset")
+        if st.session_state.get("prefetcher") is not None:
+            st.session_state.prefetcher.cancel()
         st.session_state.basic_report = None
         st.session_state.payload = None
         st.session_state.questions_report = None
         st.session_state.houses_report = None
         st.rerun()
 
+    hit_rates = prompt_cache_hit_rates()
+    if hit_rates:
+        cache_stats = prompt_cache_stats()
+        with st.expander("📈 Prompt caching (cached tokens ανά γεννήτρια)", expanded=False):
+            for generator, rate in hit_rates.items():
+                stats = cache_stats[generator]
+                st.markdown(
+                    f"- **{generator}**: {rate:.0%} "
+                    f"({stats['cached_tokens']}/{stats['prompt_tokens']} tokens, {stats['calls']} κλήσεις)"
+                )
+
+    with st.expander("⏱️ Telemetry κλήσεων μοντέλου", expanded=False):
+        # Το ledger διαβάζεται μόνο κατ' απαίτηση· αλλιώς κάθε rerun θα πλήρωνε ένα πλήρες scan.
+        if st.toggle("Φόρτωση στατιστικών", key="show_telemetry"):
+            summary = telemetry_summary()
+            if summary["per_type"]:
+                st.dataframe(summary["per_type"], use_container_width=True)
+                st.markdown(
+                    f"**Χάρτες:** {summary['charts']} | "
+                    f"**Μέσο κόστος/χάρτη:** ${summary['avg_cost_per_chart_usd']:.4f} | "
+                    f"**Μέγιστο κόστος/χάρτη:** ${summary['max_cost_per_chart_usd']:.4f}"
+                )
+                if summary["cancelled_calls"]:
+                    st.markdown(
+                        f"**Ακυρωμένες κλήσεις:** {summary['cancelled_calls']} | "
+                        f"**Tokens που γλιτώσαμε (εκτίμηση):** {summary['tokens_saved']}"
+                    )
+            else:
+                st.info("Δεν υπάρχουν ακόμη καταγεγραμμένες κλήσεις.")
+
+    archive_stats = REPORT_ARCHIVE.stats()
+    if archive_stats["reports"]:
+        with st.expander("🗜️ Αρχείο αναφορών (συμπίεση & αποδιπλασιασμός)", expanded=False):
+            st.markdown(
+                f"**Αναφορές:** {archive_stats['reports']} | "
+                f"**Παράγραφοι:** {archive_stats['paragraphs']} "
+                f"({archive_stats['unique_paragraphs']} μοναδικές) | "
+                f"**Codec:** {archive_stats['codec']}, {archive_stats['dictionaries']} λεξικά"
+            )
+            st.markdown(
+                f"**Λόγος συμπίεσης:** {archive_stats['ratio']:.1f}x | "
+                f"**Μνήμη:** {archive_stats['raw_bytes'] / 1024:.0f} KB → "
+                f"{archive_stats['stored_bytes'] / 1024:.0f} KB "
+                f"(εξοικονόμηση {archive_stats['saved_bytes'] / 1024:.0f} KB)"
+            )
+
     st.caption("💡 **Tip:** Το caching εξοικονομεί χρόνο & κόστος στις επαναλήψεις.")
 
 
@@ -0,0 +1,100 @@
+"""Cancellation tokens for model calls, scoped to a Streamlit session.
+
+Τα tokens και το GenerationScope ζουν στο st.session_state και περνούν από το ένα
+rerun στο άλλο· γι' αυτό ορίζονται εδώ και όχι στο app.py, που το Streamlit το
+ξαναεκτελεί σε νέο module σε κάθε rerun (ένα except GenerationCancelled ενός
+νεότερου run δεν θα έπιανε την κλάση ενός παλαιότερου).
+"""
+import threading
+import time
+import weakref
+from typing import Optional, Tuple
+
+CANCEL_REASONS_GR = {
+    "deadline": "ξεπεράστηκε το χρονικό όριο",
+    "reset": "επανεκκίνηση",
+    "chart_changed": "άλλαξε ο χάρτης",
+    "stopped": "διακόπηκε η εκτέλεση",
+    "session_closed": "έκλεισε η συνεδρία",
+    "prefetch_cancelled": "ακυρώθηκε η προφόρτωση",
+}
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a model call whose token was cancelled or whose deadline passed."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Η κλήση ακυρώθηκε: {CANCEL_REASONS_GR.get(reason, reason)}")
+        self.reason = reason
+
+
+class GenerationToken:
+    """Cancellation flag shared by the model calls of one request.
+
+    Η cancel() καλείται από οποιοδήποτε thread· η call_openai_chat ελέγχει το token
+    σε κάθε chunk και κλείνει το stream, ώστε ο provider να σταματήσει την παραγωγή.
+    """
+
+    def __init__(self, key: Optional[Tuple[int, str]] = None):
+        self.key = key
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str) -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def check(self, deadline: Optional[float] = None) -> None:
+        """Raise GenerationCancelled if cancelled or past deadline (time.perf_counter)."""
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason)
+        if deadline is not None and time.perf_counter() >= deadline:
+            raise GenerationCancelled("deadline")
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to seconds; True if cancelled meanwhile."""
+        return self._event.wait(seconds)
+
+
+def _cancel_tokens(tokens: "weakref.WeakSet[GenerationToken]", reason: str) -> None:
+    for token in list(tokens):
+        token.cancel(reason)
+
+
+class GenerationScope:
+    """The session's live generation tokens, bound to reset_counter and the chart inputs.
+
+    Ζει στο st.session_state. Κάθε token δημιουργείται με το τρέχον κλειδί
+    (reset_counter, hash στοιχείων χάρτη)· όταν το κλειδί αλλάξει, όσα tokens
+    ανήκουν στο προηγούμενο ακυρώνονται. Όταν λήξει η συνεδρία, ακυρώνονται όλα.
+    """
+
+    def __init__(self):
+        self.key: Optional[Tuple[int, str]] = None
+        self._tokens: "weakref.WeakSet[GenerationToken]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        weakref.finalize(self, _cancel_tokens, self._tokens, "session_closed")
+
+    def bind(self, reset_counter: int, inputs_hash: str) -> None:
+        """Cancel tokens created for a previous reset_counter or chart."""
+        key = (reset_counter, inputs_hash)
+        with self._lock:
+            for token in list(self._tokens):
+                if token.key != key:
+                    token.cancel("reset" if token.key[0] != reset_counter else "chart_changed")
+            self.key = key
+
+    def token(self) -> GenerationToken:
+        with self._lock:
+            token = GenerationToken(self.key)
+            self._tokens.add(token)
+            return token
+
+    def cancel_all(self, reason: str) -> None:
+        with self._lock:
+            _cancel_tokens(self._tokens, reason)
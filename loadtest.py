@@ -0,0 +1,350 @@
+"""Load test για το app.py: N ταυτόχρονες συνεδρίες μέσω Streamlit AppTest.
+
+Κάθε συνεδρία φορτώνει την εφαρμογή, συμπληρώνει τον χάρτη (από τυχαία στοιχεία
+γέννησης μέσω της φόρμας υπολογισμού), πατάει τα τρία κουμπιά αναφορών και
+κάνει το rerun του κουμπιού λήψης PDF. Οι κλήσεις στο μοντέλο πηγαίνουν σε
+τοπικό ψεύτικο OpenAI endpoint με ρυθμιζόμενη καθυστέρηση.
+
+Όλες οι συνεδρίες τρέχουν σε μία διεργασία, με patches σε ιδιωτικά APIs του
+Streamlit (make_apptest_thread_safe)· ελέγχθηκαν μόνο με APPTEST_PATCHES_STREAMLIT_VERSION.
+Τα νούμερα μνήμης και cache είναι ενδεικτικά, όχι μετρήσεις πραγματικού server.
+
+Παράδειγμα:
+    python loadtest.py --sessions 1 5 10 --latency 2.0 --ttft 0.3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as dt_time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+# Η έκδοση του Streamlit με την οποία ελέγχθηκαν τα patches του make_apptest_thread_safe.
+APPTEST_PATCHES_STREAMLIT_VERSION = "1.66.0"
+STEPS = ["load", "fill_chart", "basic", "questions", "houses", "pdf"]
+
+FAKE_PARAGRAPH = (
+    "Ο χάρτης σου δείχνει μια φύση που αναζητά ισορροπία ανάμεσα στην ασφάλεια "
+    "και την ανάγκη για εξέλιξη. "
+)
+
+
+# ============ FAKE OPENAI ENDPOINT ============
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions with SSE streaming and usage, like the real API."""
+
+    latency = 1.0
+    ttft = 0.2
+    completion_chunks = 20
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        try:
+            self._stream_completion()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # ο client έκλεισε το stream (ακύρωση ή προθεσμία)
+
+    def _stream_completion(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        prompt_tokens = max(1, prompt_chars // 3)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send(payload: dict):
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode())
+            self.wfile.flush()
+
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "gpt-4o")}
+        time.sleep(self.ttft)
+        step = max(0.0, self.latency - self.ttft) / self.completion_chunks
+        for i in range(self.completion_chunks):
+            if i:
+                time.sleep(step)
+            send({**base, "choices": [{"index": 0, "delta": {"content": FAKE_PARAGRAPH},
+                                       "finish_reason": None}]})
+        send({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        send({**base, "choices": [], "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": self.completion_chunks * 25,
+            "total_tokens": prompt_tokens + self.completion_chunks * 25,
+            "prompt_tokens_details": {"cached_tokens": (prompt_tokens // 1024) * 1024 // 2},
+        }})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_fake_openai(latency: float, ttft: float) -> ThreadingHTTPServer:
+    FakeOpenAIHandler.latency = latency
+    FakeOpenAIHandler.ttft = min(ttft, latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============ MEMORY ============
+def rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def session_state_bytes(at) -> int:
+    """Approximate size of the report references and payload kept in a session's state."""
+    total = 0
+    for key in ("basic_report", "questions_report", "houses_report"):
+        value = at.session_state[key] if key in at.session_state else None
+        if value:
+            total += sys.getsizeof(value) + sum(sys.getsizeof(field) for field in value)
+    if "payload" in at.session_state and at.session_state["payload"]:
+        total += len(json.dumps(at.session_state["payload"], ensure_ascii=False).encode())
+    return total
+
+
+# ============ SESSION DRIVER ============
+def make_apptest_thread_safe() -> None:
+    """Let concurrent AppTest sessions run in one process.
+
+    Το AppTest αλλάζει καθολική κατάσταση γύρω από κάθε run (Runtime, config,
+    compile του script)· χωρίς αυτά, μια συνεδρία που τελειώνει χαλάει τις υπόλοιπες.
+    Τα patches αγγίζουν ιδιωτικά APIs και ισχύουν για όλη τη διεργασία, οπότε
+    εφαρμόζονται μόνο στην έκδοση APPTEST_PATCHES_STREAMLIT_VERSION.
+    """
+    import streamlit
+    from streamlit import config
+
+    if streamlit.__version__ != APPTEST_PATCHES_STREAMLIT_VERSION:
+        raise RuntimeError(
+            f"Τα patches του AppTest ελέγχθηκαν με streamlit=={APPTEST_PATCHES_STREAMLIT_VERSION}, "
+            f"βρέθηκε {streamlit.__version__}· τρέξε με --sessions 1 ή επαλήθευσε τα patches."
+        )
+    from streamlit.runtime import Runtime
+
+    # Το AppTest ενεργοποιεί και επαναφέρει το global.appTest γύρω από κάθε run·
+    # ενεργό για όλη τη διεργασία, η επαναφορά μιας συνεδρίας δεν επηρεάζει τις άλλες.
+    config.set_option("global.appTest", True)
+
+    # Το Runtime μηδενίζεται στο τέλος κάθε run· κρατάμε το τελευταίο ενεργό ώστε
+    # οι ταυτόχρονες συνεδρίες να μη σκοντάφτουν σε None.
+    last = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+            return cls._instance
+        if "runtime" in last:
+            return last["runtime"]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "runtime" in last)
+
+    # Κάθε run του AppTest ξαναμεταγλωττίζει το app.py· το ταυτόχρονο compile() από
+    # πολλά νήματα δεν είναι ασφαλές στην CPython 3.11, οπότε το σειριοποιούμε.
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    compile_lock = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def locked_get_bytecode(self, script_path):
+        with compile_lock:
+            return get_bytecode(self, script_path)
+
+    ScriptCache.get_bytecode = locked_get_bytecode
+
+
+def _button(at, prefix: str):
+    return next(b for b in at.button if b.label.startswith(prefix))
+
+
+def _check(at, step: str):
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].value}")
+
+
+def run_session(seed: int, timeout: float) -> Dict[str, object]:
+    """Drive one simulated user through the app; returns per-step durations in seconds."""
+    from streamlit.testing.v1 import AppTest
+    import app
+
+    rng = random.Random(seed)
+    timings: Dict[str, float] = {}
+
+    def timed(step: str, fn):
+        start = time.perf_counter()
+        fn()
+        timings[step] = time.perf_counter() - start
+        _check(at, step)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timed("load", at.run)
+
+    def fill_chart():
+        at.date_input(key="birth_date_0").set_value(
+            date(rng.randint(1940, 2010), rng.randint(1, 12), rng.randint(1, 28)))
+        at.time_input(key="birth_time_0").set_value(dt_time(rng.randint(0, 23), rng.randint(0, 59)))
+        at.number_input(key="birth_lat_0").set_value(round(rng.uniform(-55, 60), 4))
+        at.number_input(key="birth_lon_0").set_value(round(rng.uniform(-170, 170), 4))
+        _button(at, "🔭").click().run()
+
+    timed("fill_chart", fill_chart)
+    timed("basic", lambda: _button(at, "🔍").click().run())
+
+    def questions():
+        # Οι επιλογές ανήκουν στη φόρμα αναφοράς· καταχωρίζονται με το ίδιο κλικ.
+        for key in list(app.PREDEFINED_QUESTIONS)[:3]:
+            at.checkbox(key=f"q_{key}_0").check()
+        _button(at, "💎").click().run()
+
+    timed("questions", questions)
+    timed("houses", lambda: _button(at, "🏠").click().run())
+
+    def pdf():
+        # Το κλικ στο κουμπί λήψης είναι ένα rerun· το PDF το δίνει η ίδια memoized διαδρομή
+        # της εφαρμογής (φτιάχτηκε ήδη στο run των οίκων, οπότε εδώ μετράμε μόνο το rerun).
+        at.run()
+        refs = tuple(at.session_state[name] for name in ("basic_report", "questions_report", "houses_report"))
+        inputs, pdf_bytes = at.session_state["_derived"]["full_report_pdf"]
+        if inputs != refs or not pdf_bytes.startswith(b"%PDF"):
+            raise RuntimeError("pdf: invalid output")
+
+    timed("pdf", pdf)
+    return {"timings": timings, "state_bytes": session_state_bytes(at), "app_test": at}
+
+
+# ============ REPORT ============
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def run_level(n: int, timeout: float, seed_base: int, keep: list) -> Dict[str, object]:
+    import app
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    results, errors = [], []
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        futures = [pool.submit(run_session, seed_base + i, timeout) for i in range(n)]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - start
+    # Κρατάμε τις συνεδρίες ζωντανές ώστε η μνήμη να αντιστοιχεί σε ενεργούς χρήστες.
+    keep.extend(r.pop("app_test") for r in results)
+
+    steps = {}
+    for step in STEPS:
+        values = [r["timings"][step] for r in results if step in r["timings"]]
+        steps[step] = {
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+    rss_after = rss_mb()
+    return {
+        "sessions": n,
+        "completed": len(results),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_sessions_per_s": len(results) / elapsed if elapsed else 0.0,
+        "steps": steps,
+        "rss_before_mb": rss_before,
+        "rss_after_mb": rss_after,
+        "rss_growth_mb": rss_after - rss_before,
+        "rss_per_session_mb": (rss_after - rss_before) / n if n else 0.0,
+        "session_state_kb": sum(r["state_bytes"] for r in results) / 1024,
+        "archive": app.REPORT_ARCHIVE.stats(),
+    }
+
+
+def print_level(level: Dict[str, object]) -> None:
+    print(f"\n=== N={level['sessions']} | ολοκληρώθηκαν {level['completed']} "
+          f"σε {level['elapsed_s']:.1f}s | {level['throughput_sessions_per_s']:.2f} συνεδρίες/s ===")
+    print(f"{'step':<12}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}")
+    for step, stats in level["steps"].items():
+        print(f"{step:<12}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}")
+    print(f"RSS: {level['rss_before_mb']:.0f} → {level['rss_after_mb']:.0f} MB "
+          f"(+{level['rss_growth_mb']:.1f} MB, {level['rss_per_session_mb']:.2f} MB/συνεδρία) | "
+          f"session_state αναφορών: {level['session_state_kb']:.0f} KB")
+    archive = level["archive"]
+    print(f"Αρχείο αναφορών ({archive['codec']}): {archive['raw_bytes'] / 1024:.0f} → "
+          f"{archive['stored_bytes'] / 1024:.0f} KB ({archive['ratio']:.1f}x, "
+          f"{archive['unique_paragraphs']}/{archive['paragraphs']} μοναδικές παράγραφοι)")
+    for error in level["errors"][:5]:
+        print(f"  ⚠️ {error}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10],
+                        help="αριθμοί ταυτόχρονων συνεδριών, ένα επίπεδο ανά τιμή")
+    parser.add_argument("--latency", type=float, default=1.0, help="συνολική καθυστέρηση ψεύτικου μοντέλου (s)")
+    parser.add_argument("--ttft", type=float, default=0.2, help="time-to-first-token ψεύτικου μοντέλου (s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="όριο ανά rerun του AppTest (s)")
+    parser.add_argument("--json", help="αποθήκευση αποτελεσμάτων σε JSON")
+    args = parser.parse_args(argv)
+
+    server = start_fake_openai(args.latency, args.ttft)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ["OPENAI_API_KEY"] = "sk-loadtest"
+    os.environ.setdefault("ASTRO_TELEMETRY_DB", os.path.join(tempfile.mkdtemp(), "loadtest.sqlite3"))
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    # Τα imports γίνονται πριν τη μέτρηση, ώστε η αύξηση μνήμης να αφορά μόνο τις συνεδρίες.
+    import app  # noqa: F401
+    from streamlit.testing.v1 import AppTest  # noqa: F401
+    if max(args.sessions) > 1:
+        try:
+            make_apptest_thread_safe()
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            server.shutdown()
+            return 2
+    print("Σημείωση: συνεδρίες AppTest σε μία διεργασία (όχι πραγματικός server)· μνήμη/caches ενδεικτικά. "
+          "Το βήμα pdf είναι το rerun του κουμπιού λήψης· η δημιουργία του PDF μετράει στο βήμα houses.")
+
+    keep: list = []
+    levels = []
+    seed_base = 0
+    for n in args.sessions:
+        level = run_level(n, args.timeout, seed_base, keep)
+        seed_base += n
+        print_level(level)
+        levels.append(level)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(levels, f, ensure_ascii=False, indent=2)
+    server.shutdown()
+    return 0 if all(not level["errors"] for level in levels) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Compressed, deduplicated storage for generated reports.
+
+Ζει σε ξεχωριστό module ώστε το αρχείο να επιβιώνει από τα reruns του app.py
+(το Streamlit ξανατρέχει το script, όχι όμως τα imported modules).
+"""
+import hashlib
+import threading
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+ARCHIVE_TRAIN_MIN_SAMPLES = 64
+ARCHIVE_MAX_SAMPLES = ARCHIVE_TRAIN_MIN_SAMPLES * 16
+ARCHIVE_DICT_SIZE = 16 * 1024
+ZLIB_MAX_DICT_SIZE = 32 * 1024
+
+
+class ReportRef(NamedTuple):
+    """Small handle kept in st.session_state and st.cache_data instead of the report text."""
+    chart_hash: str
+    report_type: str
+    version: int
+
+
+class ReportArchive:
+    """Report versions per chart, stored as deduplicated, dictionary-compressed paragraphs.
+
+    Κάθε αναφορά χωρίζεται σε παραγράφους ("\\n\\n")· κάθε μοναδική παράγραφος
+    αποθηκεύεται μία φορά, συμπιεσμένη με λεξικό. Το αρχικό λεξικό φτιάχνεται από
+    τα σταθερά κείμενα των prompts και εκπαιδεύεται ξανά στο δικό μας corpus
+    αναφορών όσο αυτό μεγαλώνει. Με zstandard χρησιμοποιείται εκπαιδευμένο
+    λεξικό zstd· χωρίς αυτό, zlib με preset dictionary.
+    """
+
+    def __init__(self, seed: bytes):
+        self._lock = threading.Lock()
+        self._dicts: List[object] = []
+        self._codecs: List[tuple] = []
+        self._paragraphs: Dict[bytes, Tuple[int, bytes]] = {}
+        self._paragraph_refs = 0
+        self._versions: Dict[Tuple[str, str], List[Tuple[bytes, ...]]] = {}
+        self._raw_bytes = 0
+        self._samples: List[bytes] = []
+        self._next_training = ARCHIVE_TRAIN_MIN_SAMPLES
+        self._add_dictionary(seed)
+
+    def put(self, chart_hash: str, report_type: str, text: str) -> ReportRef:
+        """Archive text as the newest version for (chart_hash, report_type); identical text reuses it."""
+        paragraphs = text.split("\n\n")
+        with self._lock:
+            digests = []
+            for paragraph in paragraphs:
+                data = paragraph.encode()
+                digest = hashlib.sha1(data).digest()
+                if digest not in self._paragraphs:
+                    self._paragraphs[digest] = (len(self._dicts) - 1, self._compress(data))
+                    if self._next_training <= ARCHIVE_MAX_SAMPLES and len(self._samples) < ARCHIVE_MAX_SAMPLES and data:
+                        self._samples.append(data)
+                digests.append(digest)
+
+            versions = self._versions.setdefault((chart_hash, report_type), [])
+            if versions and versions[-1] == tuple(digests):
+                return ReportRef(chart_hash, report_type, len(versions) - 1)
+            versions.append(tuple(digests))
+            self._paragraph_refs += len(digests)
+            self._raw_bytes += len(text.encode())
+            if len(self._samples) >= self._next_training:
+                self._train()
+            return ReportRef(chart_hash, report_type, len(versions) - 1)
+
+    def get(self, ref: ReportRef) -> Optional[str]:
+        with self._lock:
+            versions = self._versions.get((ref.chart_hash, ref.report_type))
+            if not versions or ref.version >= len(versions):
+                return None
+            return "\n\n".join(
+                self._decompress(*self._paragraphs[digest]).decode()
+                for digest in versions[ref.version]
+            )
+
+    def version_count(self, chart_hash: str, report_type: str) -> int:
+        with self._lock:
+            return len(self._versions.get((chart_hash, report_type), []))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            compressed = sum(len(blob) for _, blob in self._paragraphs.values())
+            # 20 bytes (sha1) ανά αναφορά παραγράφου σε κάθε έκδοση, συν τα λεξικά και
+            # τα ασυμπίεστα δείγματα που κρατάμε μέχρι την τελευταία εκπαίδευση.
+            stored = (compressed + 20 * self._paragraph_refs + sum(map(self._dict_size, self._dicts))
+                      + sum(map(len, self._samples)))
+            return {
+                "codec": "zstd" if zstd is not None else "zlib",
+                "reports": sum(len(v) for v in self._versions.values()),
+                "paragraphs": self._paragraph_refs,
+                "unique_paragraphs": len(self._paragraphs),
+                "dictionaries": len(self._dicts),
+                "raw_bytes": self._raw_bytes,
+                "stored_bytes": stored,
+                "ratio": self._raw_bytes / stored if stored else 0.0,
+                "saved_bytes": self._raw_bytes - stored,
+            }
+
+    def _add_dictionary(self, data) -> None:
+        if zstd is not None:
+            if isinstance(data, bytes):
+                data = zstd.ZstdCompressionDict(data, dict_type=zstd.DICT_TYPE_RAWCONTENT)
+            self._codecs.append((zstd.ZstdCompressor(level=10, dict_data=data),
+                                 zstd.ZstdDecompressor(dict_data=data)))
+        else:
+            data = data[-ZLIB_MAX_DICT_SIZE:]
+            self._codecs.append((data, data))
+        self._dicts.append(data)
+
+    @staticmethod
+    def _dict_size(data) -> int:
+        return len(data) if isinstance(data, bytes) else len(data.as_bytes())
+
+    def _compress(self, data: bytes) -> bytes:
+        compressor, _ = self._codecs[-1]
+        if zstd is not None:
+            return compressor.compress(data)
+        co = zlib.compressobj(level=9, zdict=compressor)
+        return co.compress(data) + co.flush()
+
+    def _decompress(self, dict_index: int, blob: bytes) -> bytes:
+        _, decompressor = self._codecs[dict_index]
+        if zstd is not None:
+            return decompressor.decompress(blob)
+        do = zlib.decompressobj(zdict=decompressor)
+        return do.decompress(blob) + do.flush()
+
+    def _train(self) -> None:
+        self._next_training *= 4
+        try:
+            self._train_dictionary()
+        finally:
+            if self._next_training > ARCHIVE_MAX_SAMPLES:
+                # Τελευταία εκπαίδευση: τα δείγματα δεν χρειάζονται πια.
+                self._samples = []
+
+    def _train_dictionary(self) -> None:
+        if zstd is not None:
+            try:
+                trained = zstd.train_dictionary(ARCHIVE_DICT_SIZE, self._samples)
+            except zstd.ZstdError:
+                return
+            self._add_dictionary(trained)
+        else:
+            # Τα δείγματα είναι ήδη μοναδικά· το zlib κρατά τα τελευταία 32 KB, δηλαδή τα νεότερα.
+            self._add_dictionary(b"".join(self._samples))
+
+
+_archives: Dict[str, ReportArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(name: str, seed: bytes) -> ReportArchive:
+    """Process-wide archive for name; seed is only used the first time it is created."""
+    with _archives_lock:
+        if name not in _archives:
+            _archives[name] = ReportArchive(seed)
+        return _archives[name]
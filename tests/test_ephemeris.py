@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import app
+
+LATITUDES = [0.0, 37.98, 60.0, 65.9, 66.0, 66.5, 66.55, 67.0, 69.65, 75.0, 85.0, -45.0, -66.5, -69.65, -80.0]
+J2000 = 2451545.0
+
+
+def _random_births(lat: float, n: int = 5000):
+    rng = np.random.default_rng(int(abs(lat) * 100))
+    jd = 2415020.0 + rng.uniform(0, 45000, n)  # 1900–2023
+    return jd, np.full(n, lat), rng.uniform(-180, 180, n)
+
+
+@pytest.mark.parametrize("lat", LATITUDES)
+def test_house_widths_sum_to_full_circle(lat):
+    _, cusps = app.compute_longitudes(*_random_births(lat))
+    widths = (np.roll(cusps, -1, axis=1) - cusps) % 360.0
+    np.testing.assert_allclose(widths.sum(axis=1), 360.0, atol=1e-6)
+
+
+@pytest.mark.parametrize("lat", LATITUDES)
+def test_ascendant_is_east_of_mc(lat):
+    _, cusps = app.compute_longitudes(*_random_births(lat))
+    asc, mc = cusps[:, 0], cusps[:, 9]
+    assert np.all((asc - mc) % 360.0 <= 180.0)
+
+
+@pytest.mark.parametrize("body, expected", [("Sun", 280.38), ("Moon", 223.32), ("Mars", 327.98)])
+def test_reference_longitudes_at_j2000(body, expected):
+    longitudes, _ = app.compute_longitudes([J2000], [37.98], [23.73])
+    assert longitudes[0, app.EPHEMERIS_BODIES.index(body)] == pytest.approx(expected, abs=0.01)
+
+
+def _porphyry(cusps):
+    asc, mc = cusps[:, 0], cusps[:, 9]
+    return (mc + (asc - mc) % 360.0 / 3) % 360.0
+
+
+@pytest.mark.parametrize("lat, polar", [(66.3, False), (-66.3, False), (66.6, True), (-66.6, True)])
+def test_porphyry_only_beyond_the_polar_circle(lat, polar):
+    _, cusps = app.compute_longitudes(*_random_births(lat, 200))
+    assert np.allclose(cusps[:, 10], _porphyry(cusps)) == polar
+
+
+def test_assign_houses_handles_cusps_across_aries():
+    cusps = (np.arange(12) * 30.0 + 350.0)[None, :] % 360.0
+    longitudes = np.array([[355.0, 5.0, 349.0, 20.0, 200.0]])
+    np.testing.assert_array_equal(app.assign_houses(longitudes, cusps), [[1, 1, 12, 2, 8]])
+
+
+def test_find_aspects_codes_and_orbs():
+    sun, moon, mars, venus = (app.EPHEMERIS_BODIES.index(b) for b in ("Sun", "Moon", "Mars", "Venus"))
+    longitudes = (np.arange(len(app.EPHEMERIS_BODIES)) * 13.0)[None, :]
+    longitudes[0, [sun, moon, mars, venus]] = [10.0, 4.0, 197.5, 133.0]
+    codes, orbs = app.find_aspects(longitudes % 360.0)
+    names = list(app.ASPECT_ANGLES)
+
+    def pair(a, b):
+        return app.ASPECT_PAIRS.index((min(a, b), max(a, b)))
+
+    assert names[codes[0, pair(sun, moon)]] == "conjunction"
+    assert orbs[0, pair(sun, moon)] == pytest.approx(6.0)
+    assert names[codes[0, pair(sun, mars)]] == "opposition"
+    assert orbs[0, pair(sun, mars)] == pytest.approx(7.5)
+    assert names[codes[0, pair(sun, venus)]] == "trine"
+    assert orbs[0, pair(sun, venus)] == pytest.approx(3.0)
+    # 129°: 9° από το τρίγωνο, εκτός orb (7°).
+    assert codes[0, pair(moon, venus)] == -1
+    assert np.isinf(orbs[0, pair(moon, venus)])
+
+
+def test_chart_payload_shape():
+    payload = app.compute_chart_payload(datetime(2000, 1, 1, 12), 0.0, 37.98, 23.73, "Δοκιμή", "Γυναίκα")
+    assert set(payload) == {"basic_info", "houses", "planets_in_houses", "aspects"}
+    assert payload["basic_info"]["sun_sign"] == "Capricorn"
+    assert payload["basic_info"]["moon_sign"] == "Scorpio"
+    assert [h["house"] for h in payload["houses"]] == list(range(1, 13))
+    placed = {p["planet"] for p in payload["planets_in_houses"]}
+    assert placed == {en for gr, en in app.PLANETS if en not in ("AC", "MC")}
+    assert all(1 <= p["house"] <= 12 and p["sign"] for p in payload["planets_in_houses"])
+    for aspect in payload["aspects"]:
+        assert aspect["aspect"] in app.ASPECT_ANGLES
+        assert 0.0 <= aspect["orb"] <= app.ASPECT_ORBS[aspect["aspect"]]
+    sun_moon = next(a for a in payload["aspects"] if (a["p1"], a["p2"]) == ("Sun", "Moon"))
+    assert sun_moon["aspect"] == "sextile" and sun_moon["orb"] == pytest.approx(2.94, abs=0.01)
+
+
+def test_batch_matches_single_chart():
+    births = [datetime(1990, 5, 5, 10, 30), datetime(1975, 11, 2, 3, 15)]
+    batch = app.compute_chart_payloads_batch(
+        [app.julian_day_ut(b, 2.0) for b in births], [37.98, 69.65], [23.73, 18.96]
+    )
+    assert batch == [app.compute_chart_payload(b, 2.0, lat, lon)
+                     for b, lat, lon in zip(births, [37.98, 69.65], [23.73, 18.96])]
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import app
+from cancellation import GenerationToken
+
+
+def _blocking_job(token: GenerationToken, started: threading.Semaphore):
+    def job():
+        started.release()
+        while True:
+            token.check()
+            token.wait(0.01)
+    return job
+
+
+def test_jobs_cancelled_before_starting_refund_the_budget():
+    prefetcher = app.SpeculativePrefetcher(max_calls=8, max_concurrency=2)
+    token, started = GenerationToken(), threading.Semaphore(0)
+    prefetcher.start("A", {f"q{i}": _blocking_job(token, started) for i in range(7)}, token)
+    started.acquire(timeout=5)
+    started.acquire(timeout=5)
+
+    prefetcher.start("B", {})
+    prefetcher.shutdown()
+    prefetcher._executor.shutdown(wait=True)
+
+    assert prefetcher.stats["submitted"] == 2
+    assert prefetcher.stats["cancelled"] == 2
+    assert prefetcher.remaining_calls == 6
+
+
+def test_rebuilt_prefetcher_keeps_the_session_budget():
+    old = app.SpeculativePrefetcher(max_calls=3, max_concurrency=1)
+    old.start("A", {"q": lambda: "answer"})
+    assert old.take("q", timeout=5) == "answer"
+    old.shutdown()
+
+    new = app.SpeculativePrefetcher(max_calls=3, max_concurrency=2, previous=old)
+    assert new.stats["submitted"] == 1 and new.stats["used"] == 1
+    assert new.remaining_calls == 2
+    new.shutdown()
+
+
+def test_token_cancelled_job_is_resubmitted_for_the_same_chart():
+    prefetcher = app.SpeculativePrefetcher(max_calls=8, max_concurrency=1)
+    token, started = GenerationToken(), threading.Semaphore(0)
+    prefetcher.start("B", {"q": _blocking_job(token, started)}, token)
+    started.acquire(timeout=5)
+    token.cancel("chart_changed")
+    deadline = time.perf_counter() + 5
+    while "q" in prefetcher.futures and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert not prefetcher.has("q")
+
+    prefetcher.start("B", {"q": lambda: "answer"})
+    assert prefetcher.has("q")
+    assert prefetcher.take("q", timeout=5) == "answer"
+    assert prefetcher.stats == {"submitted": 2, "used": 1, "cancelled": 1, "failed": 0}
+    prefetcher.shutdown()
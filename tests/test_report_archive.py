@@ -0,0 +1,51 @@
+import pytest
+
+import report_archive
+from report_archive import ARCHIVE_MAX_SAMPLES, ARCHIVE_TRAIN_MIN_SAMPLES, ReportArchive, ReportRef
+
+SEED = "Είσαι έμπειρη, σύγχρονη ψυχολογική αστρολόγος.".encode()
+
+
+@pytest.fixture(params=["zstd", "zlib"])
+def archive(request, monkeypatch):
+    if request.param == "zstd" and report_archive.zstd is None:
+        pytest.skip("zstandard is not installed")
+    if request.param == "zlib":
+        monkeypatch.setattr(report_archive, "zstd", None)
+    return ReportArchive(SEED)
+
+
+def _report(n: int, paragraphs: int = 4) -> str:
+    return "\n\n".join(f"Παράγραφος {n}.{p}: ο Ήλιος στον {n % 12}ο οίκο δείχνει ανάγκη για έκφραση."
+                       for p in range(paragraphs))
+
+
+@pytest.mark.parametrize("text", ["", "a\n\n\nb", "μία παράγραφος", "α\n\nβ\n\nα", "\n\n"])
+def test_round_trip(archive, text):
+    assert archive.get(archive.put("chart", "basic_report", text)) == text
+
+
+def test_identical_text_reuses_the_latest_version(archive):
+    first = archive.put("chart", "basic_report", "α\n\nβ")
+    assert archive.put("chart", "basic_report", "α\n\nβ") == first == ReportRef("chart", "basic_report", 0)
+    second = archive.put("chart", "basic_report", "α\n\nγ")
+    assert second.version == 1
+    assert archive.get(first) == "α\n\nβ" and archive.get(second) == "α\n\nγ"
+    assert archive.version_count("chart", "basic_report") == 2
+    assert archive.stats()["unique_paragraphs"] == 3
+
+
+def test_unknown_refs_return_none(archive):
+    archive.put("chart", "basic_report", "α")
+    assert archive.get(ReportRef("chart", "basic_report", 1)) is None
+    assert archive.get(ReportRef("other", "basic_report", 0)) is None
+
+
+def test_training_keeps_old_reports_readable_and_frees_samples(archive):
+    refs = [(archive.put(f"chart{n}", "basic_report", _report(n)), _report(n))
+            for n in range(ARCHIVE_MAX_SAMPLES // 4 + 8)]
+    assert all(archive.get(ref) == text for ref, text in refs)
+    stats = archive.stats()
+    assert stats["dictionaries"] > 1
+    assert stats["unique_paragraphs"] > ARCHIVE_TRAIN_MIN_SAMPLES
+    assert archive._samples == []
@@ -0,0 +1,32 @@
+import pytest
+
+import app
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "TELEMETRY_DB_PATH", str(tmp_path / "telemetry.sqlite3"))
+
+
+def test_summary_separates_model_calls_hits_and_errors(ledger):
+    app.record_llm_call("basic", "c1", "none", 5000.0, model=app.OPENAI_MODEL, ttft_ms=400.0,
+                        prompt_tokens=1000, completion_tokens=800)
+    for _ in range(2):
+        app.record_llm_call("basic", "c1", "none", 20000.0, status="error", model=app.OPENAI_MODEL)
+    for _ in range(3):
+        app.record_llm_call("basic", "c1", "app", 1.0)
+    app.record_llm_call("basic", "c1", "none", 900.0, status="cancelled", completion_tokens=200)
+
+    (row,) = app.telemetry_summary()["per_type"]
+    assert row["calls"] == 7
+    assert row["model_calls"] == 1
+    assert row["cache_hits"] == 3
+    assert row["errors"] == 2
+    assert row["cancelled"] == 1
+    assert row["p50_latency_ms"] == row["p95_latency_ms"] == 5000
+    assert row["tokens_saved"] == 600
+
+
+def test_summary_of_empty_ledger(ledger):
+    summary = app.telemetry_summary()
+    assert summary["per_type"] == [] and summary["charts"] == 0